@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""audio_gui 音频链路的离线基准测试
+
+    python audio_bench.py plc --loss 0.1
+    python audio_bench.py codec
+    python audio_bench.py loopback --codec adpcm --loss 0.05 --reorder 0.02 --delay 10 --jitter 15
+"""
+import argparse, heapq, multiprocessing, random, socket, threading, time
+import numpy as np
+import audio_gui
+
+
+# ---------- 合成信号 ----------
+def synth_voice(rate, seconds, f0=140.0, seed=0):
+    """带谐波和轻微基频抖动的类语音信号，int16 单声道"""
+    rng = np.random.default_rng(seed)
+    n = int(rate * seconds)
+    t = np.arange(n) / rate
+    f = f0 * (1 + 0.03 * np.sin(2 * np.pi * 3 * t))
+    phase = 2 * np.pi * np.cumsum(f) / rate
+    x = sum(np.sin(k * phase) / k for k in range(1, 8))
+    x += 0.02 * rng.standard_normal(n)
+    return (x / np.max(np.abs(x)) * 12000).astype(np.int16)
+
+
+# ---------- 丢包隐藏 ----------
+def bench_plc(args):
+    rate, chunk = args.rate, args.chunk
+    pcm = synth_voice(rate, args.seconds)
+    frames = [pcm[i:i + chunk].tobytes() for i in range(0, len(pcm) - chunk + 1, chunk)]
+    rng = np.random.default_rng(args.seed)
+    lost = rng.random(len(frames)) < args.loss
+
+    print(f"{len(frames)} 帧, 丢包率 {lost.mean():.1%}, rate={rate}, chunk={chunk}")
+    print(f"{'算法':<10}{'隐藏帧 µs':>12}{'正常帧 µs':>12}{'隐藏帧 SNR dB':>16}")
+    for name, cls in audio_gui.CONCEALERS.items():
+        plc = cls(chunk, 1, rate)
+        t_lost = t_good = 0.0
+        err = ref = 0.0
+        for frame, is_lost in zip(frames, lost):
+            t0 = time.perf_counter()
+            out = plc.process(None if is_lost else frame)
+            dt = time.perf_counter() - t0
+            if is_lost:
+                t_lost += dt
+                a = np.frombuffer(frame, np.int16).astype(np.float64)
+                b = np.frombuffer(out, np.int16).astype(np.float64)
+                err += np.sum((a - b) ** 2)
+                ref += np.sum(a ** 2)
+            else:
+                t_good += dt
+        n_lost = max(1, int(lost.sum()))
+        n_good = max(1, len(frames) - int(lost.sum()))
+        snr = 10 * np.log10(ref / err) if err else float("inf")
+        print(f"{name:<10}{t_lost / n_lost * 1e6:>12.1f}{t_good / n_good * 1e6:>12.1f}{snr:>16.1f}")
+
+
+# ---------- 编解码 ----------
+def bench_codec(args):
+    rate, chunk = args.rate, args.chunk
+    pcm = synth_voice(rate, args.seconds)
+    frames = [pcm[i:i + chunk].tobytes() for i in range(0, len(pcm) - chunk + 1, chunk)]
+
+    print(f"{len(frames)} 帧, rate={rate}, chunk={chunk}")
+    print(f"{'编码':<8}{'字节/帧':>10}{'压缩比':>8}{'编码 µs':>10}{'解码 µs':>10}{'SNR dB':>10}")
+    for name, cls in audio_gui.CODECS.items():
+        codec = cls(1)
+        t0 = time.perf_counter()
+        encoded = [codec.encode(f) for f in frames]
+        t1 = time.perf_counter()
+        decoded = [bytes(codec.decode(e)) for e in encoded]
+        t2 = time.perf_counter()
+        a = pcm[:len(frames) * chunk].astype(np.float64)
+        b = np.frombuffer(b"".join(decoded), np.int16).astype(np.float64)
+        err = np.sum((a - b) ** 2)
+        snr = 10 * np.log10(np.sum(a ** 2) / err) if err else float("inf")
+        size = sum(map(len, encoded)) / len(frames)
+        print(f"{name:<8}{size:>10.0f}{chunk * 2 / size:>8.2f}"
+              f"{(t1 - t0) / len(frames) * 1e6:>10.1f}{(t2 - t1) / len(frames) * 1e6:>10.1f}{snr:>10.1f}")
+
+
+# ---------- 端到端回环 ----------
+TAG_GROUPS = 8   # 每帧 8 组方波：7 位帧号 + 1 位奇偶校验
+TAG_MOD = 1 << (TAG_GROUPS - 1)
+
+
+class TagSource:
+    """把帧号低 7 位编码进每帧，每组正负方波代表一位；组够长，ADPCM 的步长也能跟上，经有损编码后仍能认出"""
+
+    def __init__(self, chunk, amplitude=12000):
+        self.chunk = chunk
+        self.amplitude = amplitude
+
+    def render(self, start, frames, rate):
+        k = (start // self.chunk) % TAG_MOD
+        bits = (k >> np.arange(TAG_GROUPS - 1)) & 1
+        bits = np.append(bits, bits.sum() & 1)
+        x = np.repeat(np.where(bits, self.amplitude, -self.amplitude), frames // TAG_GROUPS)
+        return np.resize(x, frames).astype(np.int16)
+
+
+def read_tag(frame, chunk, amplitude=12000):
+    """从播放出的帧里读回帧号低 7 位；隐藏帧、舒适噪声或校验不过返回 None"""
+    x = np.frombuffer(frame, dtype=np.int16)
+    g = chunk // TAG_GROUPS
+    if x.size < g * TAG_GROUPS:
+        return None
+    means = x[:g * TAG_GROUPS].reshape(TAG_GROUPS, g)[:, g * 3 // 4:].mean(axis=1)  # 只看每组末尾，避开过渡
+    if np.min(np.abs(means)) < amplitude / 3:
+        return None
+    bits = (means > 0).astype(np.int64)
+    if bits[:-1].sum() & 1 != bits[-1]:
+        return None
+    return int(np.sum(bits[:-1] << np.arange(TAG_GROUPS - 1)))
+
+
+class LossyProxy:
+    """本机 UDP 转发：正向模拟丢包、乱序和时延抖动，反向（接收端回报）原样转回发送端"""
+
+    def __init__(self, target, loss=0.0, reorder=0.0, delay_ms=0.0, jitter_ms=0.0, seed=1):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        self.target = target
+        self.loss, self.reorder = loss, reorder
+        self.delay, self.jitter = delay_ms / 1000, jitter_ms / 1000
+        self.rng = random.Random(seed)
+        self.forwarded = 0
+        self.dropped = 0
+        self._sender = None
+        self._heap = []
+        self._n = 0
+        self._cond = threading.Condition()
+        threading.Thread(target=self._recv_loop, daemon=True).start()
+        threading.Thread(target=self._send_loop, daemon=True).start()
+
+    def _recv_loop(self):
+        while True:
+            data, addr = self.sock.recvfrom(65536)
+            if addr == self.target:
+                if self._sender:
+                    self.sock.sendto(data, self._sender)
+                continue
+            self._sender = addr
+            if self.rng.random() < self.loss:
+                self.dropped += 1
+                continue
+            delay = self.delay + self.rng.random() * self.jitter
+            if self.rng.random() < self.reorder:
+                delay += 0.02  # 压后 20 ms，落到后面的包之后
+            with self._cond:
+                self._n += 1
+                heapq.heappush(self._heap, (time.monotonic() + delay, self._n, data))
+                self._cond.notify()
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap or self._heap[0][0] > time.monotonic():
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, data = heapq.heappop(self._heap)
+            self.sock.sendto(data, self.target)
+            self.forwarded += 1
+
+
+def _run_receiver(port, args, conn):
+    device = audio_gui.FakeAudioDevice()
+    senders = {}
+    engine = audio_gui.AudioEngine()
+    engine.start_recv("recv", port, args.rate, 1, args.chunk, plc=args.plc, senders=senders, device=device).result()
+    cpu = time.process_time()
+    time.sleep(args.seconds + 1.0)
+    cpu = time.process_time() - cpu
+    engine.shutdown()
+    jb = {}
+    for remote in list(senders.values()):
+        for k, v in remote.jitter_buf.stats.items():
+            jb[k] = jb.get(k, 0) + v
+    conn.send({"played": device.played, "underruns": device.underruns, "cpu": cpu, "jb": jb})
+
+
+def _run_sender(port, args, conn):
+    device = audio_gui.FakeAudioDevice(TagSource(args.chunk))
+    engine = audio_gui.AudioEngine()
+    engine.start_send("send", "127.0.0.1", port, args.rate, 1, args.chunk, codec=args.codec, batch=args.batch,
+                      device=device).result()
+    cpu = time.process_time()
+    time.sleep(args.seconds)
+    cpu = time.process_time() - cpu
+    engine.shutdown()
+    conn.send({"captured": list(device.captured), "cpu": cpu})
+
+
+def _latencies(captured, played, chunk):
+    """按帧号匹配采集与播放时刻，返回每帧端到端延迟（秒）
+
+    帧号只有 7 位，按上一个匹配到的帧展开；离得太远或已出现过的（多半是丢包隐藏复制出来的）不计。
+    """
+    seen, out = set(), []
+    last = 0
+    for t_play, data in played:
+        tag = read_tag(data, chunk)
+        if tag is None:
+            continue
+        k = last + (tag - last) % TAG_MOD
+        if k - last > TAG_MOD * 3 // 4:
+            k -= TAG_MOD    # 比上一帧略早：乱序或重复
+        if k in seen or k >= len(captured) or k < last - 8:
+            continue
+        seen.add(k)
+        last = max(last, k)
+        out.append(t_play - captured[k])
+    return np.array(out)
+
+
+def bench_loopback(args):
+    ctx = multiprocessing.get_context("fork")
+    pairs = []
+    for i in range(args.streams):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        proxy = LossyProxy(("127.0.0.1", port), args.loss, args.reorder, args.delay, args.jitter, args.seed + i)
+        recv_conn, recv_child = ctx.Pipe()
+        send_conn, send_child = ctx.Pipe()
+        ctx.Process(target=_run_receiver, args=(port, args, recv_child), daemon=True).start()
+        pairs.append((proxy, recv_conn, send_conn, send_child))
+    time.sleep(0.3)
+    for proxy, _, _, send_child in pairs:
+        ctx.Process(target=_run_sender, args=(proxy.port, args, send_child), daemon=True).start()
+
+    print(f"{args.streams} 路, {args.seconds:.0f} 秒, 编码 {args.codec}, 聚合 {args.batch}, 隐藏 {args.plc}, "
+          f"丢包 {args.loss:.0%}, 乱序 {args.reorder:.0%}, 时延 {args.delay}+{args.jitter} ms")
+    print(f"{'路':<4}{'p50 ms':>8}{'p95 ms':>8}{'p99 ms':>8}{'抖动 ms':>9}{'欠载':>6}{'丢帧':>6}"
+          f"{'包/秒':>8}{'发送CPU%':>10}{'接收CPU%':>10}")
+    for i, (proxy, recv_conn, send_conn, _) in enumerate(pairs):
+        sent = send_conn.recv()
+        recv = recv_conn.recv()
+        lat = _latencies(sent["captured"], recv["played"], args.chunk) * 1000
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if lat.size else (float("nan"),) * 3
+        jitter = float(np.std(lat)) if lat.size else float("nan")
+        underruns = recv["underruns"] + recv["jb"].get("underruns", 0)
+        print(f"{i:<4}{p50:>8.1f}{p95:>8.1f}{p99:>8.1f}{jitter:>9.1f}{underruns:>6}{recv['jb'].get('lost', 0):>6}"
+              f"{proxy.forwarded / args.seconds:>8.1f}{sent['cpu'] / args.seconds * 100:>10.1f}"
+              f"{recv['cpu'] / (args.seconds + 1.0) * 100:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("plc", help="合成丢包下的丢包隐藏 CPU 开销")
+    p.add_argument("--rate", type=int, default=24000)
+    p.add_argument("--chunk", type=int, default=128)
+    p.add_argument("--seconds", type=float, default=20)
+    p.add_argument("--loss", type=float, default=0.1)
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_plc)
+
+    p = sub.add_parser("codec", help="各编码的压缩比与编解码开销")
+    p.add_argument("--rate", type=int, default=24000)
+    p.add_argument("--chunk", type=int, default=128)
+    p.add_argument("--seconds", type=float, default=10)
+    p.set_defaults(func=bench_codec)
+
+    p = sub.add_parser("loopback", help="经本机 UDP 跑真实收发代码，统计端到端延迟、抖动、欠载和 CPU")
+    p.add_argument("--rate", type=int, default=24000)
+    p.add_argument("--chunk", type=int, default=128)
+    p.add_argument("--seconds", type=float, default=10)
+    p.add_argument("--streams", type=int, default=1)
+    p.add_argument("--codec", choices=list(audio_gui.CODECS), default="pcm")
+    p.add_argument("--batch", default="1", help="1..8 或 auto")
+    p.add_argument("--plc", choices=list(audio_gui.CONCEALERS), default="waveform")
+    p.add_argument("--loss", type=float, default=0.0)
+    p.add_argument("--reorder", type=float, default=0.0)
+    p.add_argument("--delay", type=float, default=0.0, help="固定时延 ms")
+    p.add_argument("--jitter", type=float, default=0.0, help="随机附加时延上限 ms")
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_loopback)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,1144 @@
-import socket
-import pyaudio
+import asyncio
+import ipaddress
 import queue
+import socket
+import struct
+import time
+import wave
+import numpy as np
 import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None  # 没有声卡环境时仍可用 FakeAudioDevice
 
 __version__ = "1.1.0"
 
-# 音频发送函数
-def audio_send(receiver_ip, port, rate, channels, chunk, FORMAT=pyaudio.paInt16):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=channels, rate=rate, input=True, frames_per_buffer=chunk * 2)
-    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+# 包头: 首帧序号(uint16) + 首帧采集时间戳(uint32, 毫秒) + 编码(uint8) + 帧数(uint8)
+HEADER = struct.Struct("!HIBB")
+# 接收端回报: 标识 + 丢包率 + 抖动(毫秒)
+REPORT = struct.Struct("!4sff")
+REPORT_MAGIC = b"ARPT"
+REPORT_INTERVAL = 0.5  # 秒
+MAX_BATCH = 8          # 每个数据报最多聚合的帧数
+# 静音期间的舒适噪声标记（参照 RFC 3389）：编码 id 为 CN_ID、帧数为 0，负载是 1 字节噪声电平(-dBov)
+CN_ID = 13
+CN_INTERVAL = 0.5      # 静音期间标记包的发送间隔（秒）
+COMFORT_NOISE = object()  # JitterBuffer.get 返回此值表示发送端处于静音，应播放舒适噪声
+
+
+def seq_diff(a, b):
+    """返回 a - b，按 uint16 回绕处理"""
+    return ((a - b + 0x8000) & 0xFFFF) - 0x8000
+
+
+def ts_diff(a, b):
+    """返回 a - b，按 uint32 回绕处理"""
+    return ((a - b + 0x80000000) & 0xFFFFFFFF) - 0x80000000
+
+
+def now_ms():
+    return int(time.monotonic() * 1000) & 0xFFFFFFFF
+
+
+# 接收环形缓冲
+class PacketRing:
+    """预分配的接收缓冲：套接字用 recvfrom_into 直接写进槽位，帧以只读 memoryview 切片交给播放端
+
+    收到的包被抖动缓冲收下后才 advance() 占用新槽位；迟到、重复的包原地覆盖。
+    每个槽位带代数，帧引用时记下 token，播放前用 valid() 确认槽位没被后来的包覆盖。
+    """
+
+    def __init__(self, slots, slot_size):
+        self._buf = bytearray(slots * slot_size)
+        rw, ro = memoryview(self._buf), memoryview(self._buf).toreadonly()
+        self._rw = [rw[i * slot_size:(i + 1) * slot_size] for i in range(slots)]
+        self._ro = [ro[i * slot_size:(i + 1) * slot_size] for i in range(slots)]
+        self.slot_size = slot_size
+        self._gen = [0] * slots
+        self._index = 0
+
+    def recv(self, sock):
+        """接收一个数据报到当前槽位，返回 (只读视图, 来源地址)"""
+        n, addr = sock.recvfrom_into(self._rw[self._index])
+        return self._ro[self._index][:n], addr
+
+    def token(self):
+        """当前槽位的 (序号, 代数)"""
+        return self._index, self._gen[self._index]
+
+    def valid(self, token):
+        return self._gen[token[0]] == token[1]
+
+    def advance(self):
+        self._index = (self._index + 1) % len(self._rw)
+        self._gen[self._index] += 1
+
+
+# 自适应抖动缓冲
+class JitterBuffer:
+    """按序号重排音频帧，丢弃迟到帧，并根据实测抖动调整目标深度"""
+
+    def __init__(self, frame_ms, min_depth=2, max_depth=100):
+        self.frame_ms = frame_ms
+        self.min_depth = min_depth
+        self.max_depth = max_depth
+        self.target = min_depth
+        self.jitter = 0.0           # 到达间隔抖动估计（毫秒，RFC 3550）
+        self.burst = 1              # 最近一个数据报的帧数
+        self.silent = False         # 发送端是否已宣告静音
+        self.silent_from = 0        # 静音开始的序号
+        self.noise_level = 127      # 舒适噪声电平(-dBov)
+        self.frames = {}            # seq -> payload
+        self.next_seq = None        # 下一个要播放的序号
+        self.playing = False        # False 表示正在缓冲，未开始出帧
+        self.stats = {"received": 0, "late": 0, "lost": 0, "dropped": 0, "underruns": 0}
+        self._last = None           # 上一个包的 (到达时间, 时间戳)
+        self._backlog = 0           # 连续积压的出帧次数
+        self._cond = threading.Condition()
+
+    def put(self, seq, ts, frames):
+        """放入从 seq 开始的连续若干帧（一个数据报可能聚合了多帧），返回实际收下的帧数"""
+        arrival = time.monotonic() * 1000
+        with self._cond:
+            self.stats["received"] += len(frames)
+            if self._last is not None:
+                d = (arrival - self._last[0]) - ts_diff(ts, self._last[1])
+                self.jitter += (abs(d) - self.jitter) / 16
+            self._last = (arrival, ts)
+            # 两个数据报之间要靠缓冲里的帧撑过去，所以目标深度至少是一个包的帧数
+            self.burst = len(frames)
+            depth = int(3 * self.jitter / self.frame_ms) + self.burst
+            self.target = max(self.min_depth, min(self.max_depth, depth))
+
+            accepted = 0
+            for i, payload in enumerate(frames):
+                s = (seq + i) & 0xFFFF
+                if self.silent and seq_diff(s, self.silent_from) >= 0:
+                    self.silent = False     # 新的语音段开始
+                if self.next_seq is not None:
+                    ahead = seq_diff(s, self.next_seq)
+                    if ahead < 0:
+                        self.stats["late"] += 1     # 已经播过（或已判丢）的帧
+                        continue
+                    if ahead >= 2 * self.max_depth:
+                        # 发送端重启或长时间中断，重新同步
+                        self.frames.clear()
+                        self.next_seq = None
+                        self.playing = False
+                if s in self.frames:
+                    continue
+                self.frames[s] = payload
+                accepted += 1
+                if len(self.frames) > self.max_depth:
+                    del self.frames[self._oldest()]
+                    self.stats["dropped"] += 1
+            self._cond.notify()
+            return accepted
+
+    def mark_silence(self, seq, level):
+        """发送端宣告从 seq 起进入静音，之后的空档不算丢包或欠载"""
+        with self._cond:
+            if any(seq_diff(s, seq) >= 0 for s in self.frames):
+                return  # 乱序到达的旧标记，新的语音段已经开始
+            self.silent = True
+            self.silent_from = seq
+            self.noise_level = level
+            self._cond.notify()
+
+    def get(self, timeout=0.2):
+        """取出下一帧；返回 None 表示该帧缺失（丢包、欠载或仍在缓冲），
+        返回 COMFORT_NOISE 表示发送端静音"""
+        with self._cond:
+            if not self.playing:
+                if self.silent and len(self.frames) < self.target:
+                    return COMFORT_NOISE
+                if not self._cond.wait_for(lambda: len(self.frames) >= self.target, timeout):
+                    return None
+                self.playing = True
+                self.next_seq = self._oldest()
+            if not self.frames:
+                self.playing = False
+                if self.silent:
+                    return COMFORT_NOISE
+                # 欠载：重新缓冲到目标深度
+                self.stats["underruns"] += 1
+                return None
+            # 持续积压时每 8 帧跳过一帧，把延迟平缓地拉回目标深度
+            if len(self.frames) > self.target + self.target // 2 + self.burst + 1:
+                self._backlog += 1
+                if self._backlog >= 8:
+                    self._backlog = 0
+                    oldest = self._oldest()
+                    self.frames.pop(oldest)
+                    self.next_seq = (oldest + 1) & 0xFFFF
+                    self.stats["dropped"] += 1
+            else:
+                self._backlog = 0
+            payload = self.frames.pop(self.next_seq, None)
+            if payload is None:
+                self.stats["lost"] += 1
+            self.next_seq = (self.next_seq + 1) & 0xFFFF
+            return payload
+
+    def _oldest(self):
+        ref = self.next_seq if self.next_seq is not None else next(iter(self.frames))
+        return min(self.frames, key=lambda s: seq_diff(s, ref))
+
+
+# 丢包隐藏（PLC）
+class Concealer:
+    """丢包隐藏基类：缺帧时生成替代帧，恢复时与真实帧做短交叉淡化
+
+    子类只需实现 _generate(n)，返回紧接在已输出音频之后的 n 个样本
+    （形状为 (n, channels) 的 float32 数组）。
+    """
+    OVERLAP = 32  # 恢复时交叉淡化的样本数
+
+    def __init__(self, chunk, channels, rate):
+        self.chunk = chunk
+        self.channels = channels
+        self.rate = rate
+        self.lost = 0               # 连续丢帧数
+        self._carry = None          # 上次隐藏帧之后的延续部分，用于交叉淡化
+        ov = min(self.OVERLAP, chunk)
+        self._ramp = np.linspace(0, 1, ov, endpoint=False, dtype=np.float32)[:, None]
+
+    def process(self, data):
+        """data 为 None 表示缺帧；返回要写入声卡的 bytes"""
+        if data is None:
+            self.lost += 1
+            out = self._generate(self.chunk + len(self._ramp))
+            self._carry = out[self.chunk:]
+            out = out[:self.chunk]
+            self._remember(out)
+            return np.clip(out, -32768, 32767).astype(np.int16).tobytes()
+
+        frame = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+        if self.lost:
+            ov = len(self._ramp)
+            frame = frame.astype(np.float32)
+            frame[:ov] = self._carry * (1 - self._ramp) + frame[:ov] * self._ramp
+            self.lost = 0
+            self._remember(frame)
+            return np.clip(frame, -32768, 32767).astype(np.int16).tobytes()
+        self._remember(frame)
+        return data
+
+    def _remember(self, frame):
+        pass
+
+    def _generate(self, n):
+        raise NotImplementedError
+
+
+class SilenceConcealer(Concealer):
+    """缺帧时输出静音"""
+
+    def _generate(self, n):
+        return np.zeros((n, self.channels), dtype=np.float32)
+
+
+class FadeConcealer(Concealer):
+    """重复最后一个好帧，每多丢一帧增益减半，并在帧内线性过渡"""
+
+    def __init__(self, chunk, channels, rate):
+        super().__init__(chunk, channels, rate)
+        self._last = np.zeros((chunk, channels), dtype=np.float32)
+
+    def _remember(self, frame):
+        if not self.lost:
+            self._last = frame.astype(np.float32)
+
+    def _generate(self, n):
+        start, end = 0.5 ** (self.lost - 1), 0.5 ** self.lost
+        gain = np.linspace(start, end, n, dtype=np.float32)[:, None]
+        idx = np.arange(n) % self.chunk
+        return self._last[idx] * gain
+
+
+class WaveformConcealer(Concealer):
+    """基音波形匹配：在历史样本中找最相似的周期，相位连续地延拓，并逐帧衰减"""
+
+    def __init__(self, chunk, channels, rate, history_ms=40, fade_frames=4):
+        super().__init__(chunk, channels, rate)
+        self.min_lag = max(1, rate // 400)          # 最高 400 Hz
+        self.max_lag = rate // 70                   # 最低 70 Hz
+        self.win = max(self.max_lag // 2, 32)        # 匹配窗口
+        size = max(int(rate * history_ms / 1000), self.max_lag + self.win)
+        self._hist = np.zeros((size, channels), dtype=np.float32)
+        self._period = None
+        self._phase = 0
+        self._fade = 1.0 / (fade_frames * chunk)
+
+    def _remember(self, frame):
+        if self.lost:
+            return  # 历史只保留真实音频，延拓靠相位推进
+        n = min(len(frame), len(self._hist))
+        self._hist[:-n] = self._hist[n:]
+        self._hist[-n:] = frame[-n:]
+
+    def _find_period(self):
+        x = self._hist[:, 0]
+        tail = x[-self.win:]
+        energy = float(tail @ tail)
+        if energy < 1.0:
+            return self.chunk
+        # 一次性计算所有候选延迟的归一化互相关
+        segs = np.lib.stride_tricks.sliding_window_view(x[:-self.min_lag], self.win)
+        lags = np.arange(self.min_lag, self.max_lag + 1)
+        cand = segs[len(x) - self.win - lags]
+        corr = cand @ tail
+        norm = np.sqrt(np.einsum("ij,ij->i", cand, cand) * energy) + 1e-9
+        return int(lags[np.argmax(corr / norm)])
+
+    def _generate(self, n):
+        if self.lost == 1:
+            self._period = self._find_period()
+            self._phase = 0
+        p = self._period
+        idx = (self._phase + np.arange(n)) % p
+        out = self._hist[len(self._hist) - p + idx]
+        # 延拓越久越不可信，线性衰减到静音
+        start = 1.0 - (self.lost - 1) * self.chunk * self._fade
+        gain = np.clip(start - np.arange(n) * self._fade, 0, 1).astype(np.float32)[:, None]
+        self._phase = (self._phase + self.chunk) % p
+        return out * gain
+
+
+class ComfortNoise:
+    """按给定电平输出舒适噪声；噪声样本预先生成，逐帧只做切片"""
+
+    def __init__(self, chunk, channels, frames=16, seed=0):
+        self.frame_bytes = chunk * channels * 2
+        self._base = np.random.default_rng(seed).standard_normal(chunk * channels * frames).astype(np.float32)
+        self._level = None
+        self._view = None
+        self._pos = 0
+
+    def frame(self, level):
+        if level != self._level:
+            amp = 32768 * 10 ** (-level / 20)
+            buf = np.clip(self._base * amp, -32768, 32767).astype(np.int16)
+            self._view = memoryview(buf.tobytes())
+            self._level = level
+        data = self._view[self._pos:self._pos + self.frame_bytes]
+        self._pos = (self._pos + self.frame_bytes) % len(self._view)
+        return data
+
+
+CONCEALERS = {
+    "silence": SilenceConcealer,
+    "fade": FadeConcealer,
+    "waveform": WaveformConcealer,
+}
+
+
+# 编解码
+class PCMCodec:
+    """原始 16 位 PCM 直通
+
+    decode 返回只读缓冲，可能直接引用输入或解码器内部复用的输出区，
+    只保证在同一解码器下一次 decode 之前有效。
+    """
+    id, name = 0, "pcm"
+
+    def __init__(self, channels):
+        self.channels = channels
+        self._out = None
+
+    def encode(self, pcm):
+        return pcm
+
+    def decode(self, data):
+        return data
+
+    def _output(self, samples):
+        """取复用的 int16 输出区，避免每帧分配"""
+        if self._out is None or self._out.size != samples:
+            self._out = np.empty(samples, dtype=np.int16)
+        return self._out
+
+
+def _build_g711_tables():
+    # 编码表按 uint16 视图下标排列，查表时直接用 PCM 的原始位模式
+    x = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32)
+
+    # μ-law（G.711，14 位有效精度）
+    v = x >> 2
+    mask = np.where(v < 0, 0x7F, 0xFF)
+    v = np.minimum(np.abs(v), 8159) + 0x21
+    seg = np.searchsorted(np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF]), v)
+    uval = np.where(seg >= 8, 0x7F, (np.minimum(seg, 7) << 4) | ((v >> (seg + 1)) & 0x0F))
+    ulaw_enc = ((uval ^ mask) & 0xFF).astype(np.uint8)
+
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    exp = (u >> 4) & 0x07
+    mag = ((((u & 0x0F) << 3) + 0x84) << exp) - 0x84
+    ulaw_dec = np.where(u & 0x80, -mag, mag).astype(np.int16)
+
+    # A-law（G.711，13 位有效精度）
+    v = x >> 3
+    mask = np.where(v >= 0, 0xD5, 0x55)
+    v = np.where(v >= 0, v, -v - 1)
+    seg = np.searchsorted(np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF]), v)
+    shift = np.where(seg < 2, 1, seg)
+    aval = np.where(seg >= 8, 0x7F, (np.minimum(seg, 7) << 4) | ((v >> shift) & 0x0F))
+    alaw_enc = ((aval ^ mask) & 0xFF).astype(np.uint8)
+
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    seg = (a & 0x70) >> 4
+    t = ((a & 0x0F) << 4) + np.where(seg == 0, 8, 0x108)
+    t = np.where(seg > 1, t << np.maximum(seg - 1, 0), t)
+    alaw_dec = np.where(a & 0x80, t, -t).astype(np.int16)
+    return ulaw_enc, ulaw_dec, alaw_enc, alaw_dec
+
+
+ULAW_ENC, ULAW_DEC, ALAW_ENC, ALAW_DEC = _build_g711_tables()
+
+
+class ULawCodec(PCMCodec):
+    """G.711 μ-law，2:1，查表实现"""
+    id, name = 1, "ulaw"
+    enc_table, dec_table = ULAW_ENC, ULAW_DEC
+
+    def encode(self, pcm):
+        return self.enc_table[np.frombuffer(pcm, dtype=np.uint16)].tobytes()
+
+    def decode(self, data):
+        codes = np.frombuffer(data, dtype=np.uint8)
+        out = self._output(codes.size)
+        np.take(self.dec_table, codes, out=out)
+        # 按字节格式交出：PyAudio 用 len(frames) 计帧，int16 格式的视图只会播一半
+        return memoryview(out).cast("B").toreadonly()
+
+
+class ALawCodec(ULawCodec):
+    """G.711 A-law，2:1，查表实现"""
+    id, name = 2, "alaw"
+    enc_table, dec_table = ALAW_ENC, ALAW_DEC
+
+
+IMA_INDEX = [-1, -1, -1, -1, 2, 4, 6, 8]
+IMA_STEP = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767,
+]
+# 按 (index * 16 + code) 预先算好的预测增量和下一个 index，解码内层循环只剩查表
+_steps = np.array(IMA_STEP)[:, None]
+_codes = np.arange(16)[None, :]
+_vpdiff = (_steps >> 3) + (_codes & 4 > 0) * _steps + (_codes & 2 > 0) * (_steps >> 1) \
+    + (_codes & 1 > 0) * (_steps >> 2)
+IMA_DELTA = np.where(_codes & 8, -_vpdiff, _vpdiff).ravel().tolist()
+IMA_NEXT = np.clip(np.arange(89)[:, None] + np.array(IMA_INDEX * 2)[None, :], 0, 88).ravel().tolist()
+
+
+class ADPCMCodec(PCMCodec):
+    """IMA-ADPCM，约 4:1
+
+    每个包是自带初值的独立块：每个声道 4 字节块头（预测值 int16 + 步长索引 uint8 + 填充），
+    之后是各声道依次排列的 4 位码字（低半字节在前）。丢包不会让后续包解码失步。
+    量化递推是逐样本串行的，只能查表；打包和拆包用数组运算。
+    """
+    id, name = 3, "adpcm"
+    BLOCK = struct.Struct("<hBx")
+
+    def __init__(self, channels):
+        super().__init__(channels)
+        self._index = [0] * channels    # 发送端跨包延续步长索引，收敛更快
+
+    def encode(self, pcm):
+        samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, self.channels)
+        heads, bodies = [], []
+        for ch in range(self.channels):
+            x = samples[:, ch].tolist()
+            pred, index = x[0], self._index[ch]
+            heads.append(self.BLOCK.pack(pred, index))
+            codes = []
+            for sample in x:
+                step = IMA_STEP[index]
+                diff = sample - pred
+                code = 8 if diff < 0 else 0
+                diff = abs(diff)
+                if diff >= step:
+                    code |= 4
+                    diff -= step
+                if diff >= step >> 1:
+                    code |= 2
+                    diff -= step >> 1
+                if diff >= step >> 2:
+                    code |= 1
+                k = index * 16 + code
+                pred = min(32767, max(-32768, pred + IMA_DELTA[k]))
+                index = IMA_NEXT[k]
+                codes.append(code)
+            self._index[ch] = index
+            if len(codes) % 2:
+                codes.append(0)
+            c = np.array(codes, dtype=np.uint8)
+            bodies.append((c[0::2] | (c[1::2] << 4)).tobytes())
+        return b"".join(heads) + b"".join(bodies)
+
+    def decode(self, data):
+        hsize = self.BLOCK.size * self.channels
+        body = np.frombuffer(data, dtype=np.uint8, offset=hsize).reshape(self.channels, -1)
+        codes = np.empty((self.channels, body.shape[1] * 2), dtype=np.uint8)
+        codes[:, 0::2] = body & 0x0F
+        codes[:, 1::2] = body >> 4
+        out = self._output(codes.size).reshape(-1, self.channels)
+        for ch in range(self.channels):
+            pred, index = self.BLOCK.unpack_from(data, ch * self.BLOCK.size)
+            x = []
+            for code in codes[ch].tolist():
+                k = index * 16 + code
+                pred = min(32767, max(-32768, pred + IMA_DELTA[k]))
+                index = IMA_NEXT[k]
+                x.append(pred)
+            out[:, ch] = x
+        return memoryview(self._out).cast("B").toreadonly()  # 字节格式，见 ULawCodec.decode
+
+
+CODECS = {c.name: c for c in (PCMCodec, ULawCodec, ALawCodec, ADPCMCodec)}
+CODEC_IDS = {c.id: c for c in CODECS.values()}
+
+
+# 聚合帧数控制
+class BatchController:
+    """根据接收端回报的丢包率和抖动调整每个数据报聚合的帧数
+
+    出现拥塞迹象（丢包或抖动偏高）时帧数加倍，少发包；连续几次回报都干净时逐个减少，
+    把延迟收回来。聚合带来的额外延迟不超过 max_delay_ms。
+    """
+    LOSS_HIGH, LOSS_LOW = 0.02, 0.005
+    CLEAN_REPORTS = 4
+
+    def __init__(self, frame_ms, batch="auto", max_batch=MAX_BATCH, max_delay_ms=40):
+        self.adaptive = batch == "auto"
+        self.max_batch = max(1, min(max_batch, int(max_delay_ms // frame_ms)))
+        # 固定帧数也不能超过 MAX_BATCH，否则数据报比接收端的环形缓冲槽大，会被当成截断包丢掉
+        self.batch = 1 if self.adaptive else max(1, min(int(batch), MAX_BATCH))
+        self.frame_ms = frame_ms
+        self._clean = 0
+
+    def report(self, loss, jitter):
+        if not self.adaptive:
+            return
+        if loss > self.LOSS_HIGH or jitter > 4 * self.frame_ms * self.batch:
+            self.batch = min(self.max_batch, self.batch * 2)
+            self._clean = 0
+        elif loss < self.LOSS_LOW and jitter < self.frame_ms * self.batch:
+            self._clean += 1
+            if self._clean >= self.CLEAN_REPORTS and self.batch > 1:
+                self.batch -= 1
+                self._clean = 0
+
+
+# 语音检测
+class VoiceDetector:
+    """基于帧能量的语音检测，带拖尾计时，避免把句间的短停顿切掉"""
+
+    def __init__(self, frame_ms, threshold_db=-45.0, hangover_ms=300):
+        self.threshold = threshold_db
+        self.hangover = max(1, int(hangover_ms / frame_ms))
+        self.noise_db = -90.0       # 静音段电平的平滑估计，用作舒适噪声电平
+        self._quiet = self.hangover  # 连续低于门限的帧数，初始视为静音
+
+    @property
+    def noise_level(self):
+        """RFC 3389 格式的噪声电平(-dBov, 0~127)"""
+        return int(min(127, max(0, -self.noise_db)))
+
+    def update(self, pcm):
+        """返回 True 表示该帧需要发送"""
+        x = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        db = 10 * np.log10(float(x @ x) / (x.size * 32768.0 ** 2) + 1e-10)
+        if db >= self.threshold:
+            self._quiet = 0
+            return True
+        self._quiet += 1
+        if self._quiet <= self.hangover:
+            return True
+        self.noise_db += (db - self.noise_db) / 8
+        return False
+
+
+# 音频设备
+class PyAudioDevice:
+    """PyAudio 声卡"""
+
+    def __init__(self):
+        self._pa = pyaudio.PyAudio()
+
+    def open_input(self, format, channels, rate, chunk):
+        return self._pa.open(format=format or pyaudio.paInt16, channels=channels, rate=rate, input=True,
+                             frames_per_buffer=chunk * 2)
+
+    def open_output(self, format, channels, rate, chunk):
+        return self._pa.open(format=format or pyaudio.paInt16, channels=channels, rate=rate, output=True,
+                             frames_per_buffer=chunk * 2)
+
+    def terminate(self):
+        self._pa.terminate()
+
+
+class SineSource:
+    """正弦信号源"""
+
+    def __init__(self, freq=440.0, amplitude=8000):
+        self.freq = freq
+        self.amplitude = amplitude
+
+    def render(self, start, frames, rate):
+        t = (start + np.arange(frames)) / rate
+        return (self.amplitude * np.sin(2 * np.pi * self.freq * t)).astype(np.int16)
 
+
+class WaveSource:
+    """循环播放 16 位 wav 文件（多声道取第一声道）"""
+
+    def __init__(self, path):
+        with wave.open(path, "rb") as w:
+            data = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+            self.samples = data.reshape(-1, w.getnchannels())[:, 0].copy()
+
+    def render(self, start, frames, rate):
+        return self.samples[(start + np.arange(frames)) % len(self.samples)]
+
+
+class FakeAudioDevice:
+    """不依赖声卡的确定性设备
+
+    输入流按实时节奏产出 source 的样本，并记录每次读取的首样本采集时刻；
+    输出流按采样率模拟播放，缓冲满时阻塞写入，记录每次写入的首样本播放时刻和数据，
+    播放位置追上写入位置即记一次欠载。
+    """
+
+    def __init__(self, source=None):
+        self.source = source or SineSource()
+        self.captured = []   # 首样本采集时刻
+        self.played = []     # (首样本播放时刻, 数据)
+        self.underruns = 0
+
+    def open_input(self, format, channels, rate, chunk):
+        return _FakeInputStream(self, channels, rate)
+
+    def open_output(self, format, channels, rate, chunk):
+        return _FakeOutputStream(self, channels, rate, chunk * 2)
+
+    def terminate(self):
+        pass
+
+
+class _FakeInputStream:
+    def __init__(self, device, channels, rate):
+        self.device, self.channels, self.rate = device, channels, rate
+        self.pos = 0
+        self.t0 = None
+
+    def read(self, frames, exception_on_overflow=True):
+        if self.t0 is None:
+            self.t0 = time.monotonic()
+        start = self.pos
+        self.pos += frames
+        delay = self.t0 + self.pos / self.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)  # 等到这些样本“录完”
+        self.device.captured.append(self.t0 + start / self.rate)
+        x = self.device.source.render(start, frames, self.rate)
+        return np.repeat(x, self.channels).tobytes()
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FakeOutputStream:
+    def __init__(self, device, channels, rate, capacity):
+        self.device, self.channels, self.rate = device, channels, rate
+        self.capacity = capacity / rate   # 设备缓冲时长（秒）
+        self.end = None                    # 已写入数据播完的时刻
+
+    def write(self, frames, num_frames=None, exception_on_underflow=False):
+        # 和 PyAudio 的 Stream.write 一样按 len(frames) 计帧：非字节格式的 memoryview 会少算
+        n = num_frames if num_frames is not None else len(frames) // (2 * self.channels)
+        now = time.monotonic()
+        if self.end is None or self.end < now:
+            if self.end is not None:
+                self.device.underruns += 1
+            self.end = now
+        self.device.played.append((self.end, bytes(frames)))
+        self.end += n / self.rate
+        delay = self.end - now - self.capacity
+        if delay > 0:
+            time.sleep(delay)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def parse_destinations(text, port):
+    """把 "ip1, ip2:port, 组播地址" 形式的目标解析成 [(ip, port), ...]"""
+    dests = []
+    for item in text.replace(";", ",").replace(" ", ",").split(","):
+        if not item:
+            continue
+        host, _, p = item.partition(":")
+        dests.append((host, int(p) if p else port))
+    return dests
+
+
+def is_multicast(host):
     try:
-        print("开始发送音频数据...")
-        while True:
-            data = stream.read(chunk)  # 从麦克风读取数据
-            udp_socket.sendto(data, (receiver_ip, port))  # 发送音频数据到接收端
-    except KeyboardInterrupt:
-        print("停止发送音频数据...")
-    finally:
+        return ipaddress.ip_address(host).is_multicast
+    except ValueError:
+        return False  # 主机名
+
+
+# 发送流水线
+class SendPipeline:
+    """把采集到的帧变成待发的数据报：静音检测、编码、聚合、舒适噪声标记；不做任何 IO"""
+
+    def __init__(self, rate, channels, chunk, codec="pcm", batch=1, vad=False):
+        frame_ms = chunk * 1000 / rate
+        self.encoder = CODECS[codec](channels)
+        self.controller = BatchController(frame_ms, batch)
+        self.detector = VoiceDetector(frame_ms) if vad else None
+        self.seq = 0
+        self._frames = []
+        self._ts = 0
+        self._last_cn = 0.0
+
+    def feed(self, data):
+        """输入一帧采集数据，返回需要发送的数据报列表（多数时候为空或只有一个）"""
+        packets = []
+        if self.detector is not None and not self.detector.update(data):
+            # 静音：先发出已攒的帧，之后只定期发舒适噪声标记
+            if self._frames:
+                packets.append(self._flush())
+            now = time.monotonic()
+            if now - self._last_cn >= CN_INTERVAL:
+                packets.append(HEADER.pack(self.seq, now_ms(), CN_ID, 0) + bytes([self.detector.noise_level]))
+                self._last_cn = now
+            return packets
+        self._last_cn = 0.0
+        if not self._frames:
+            self._ts = now_ms()
+        self._frames.append(self.encoder.encode(data))
+        if len(self._frames) >= self.controller.batch:
+            packets.append(self._flush())
+        return packets
+
+    def on_report(self, data):
+        """处理接收端发回的回报包"""
+        if len(data) == REPORT.size and data[:4] == REPORT_MAGIC:
+            _, loss, jitter = REPORT.unpack(data)
+            self.controller.report(loss, jitter)
+
+    def _flush(self):
+        packet = HEADER.pack(self.seq, self._ts, self.encoder.id, len(self._frames)) + b"".join(self._frames)
+        self.seq = (self.seq + len(self._frames)) & 0xFFFF
+        self._frames = []
+        return packet
+
+
+# 接收端的单个发送端
+class RemoteStream:
+    """接收端为每个发送端地址维护的状态：抖动缓冲、丢包隐藏、解码器和回报计数"""
+
+    def __init__(self, addr, ring, rate, channels, chunk, max_depth, plc):
+        self.addr = addr
+        self.ring = ring
+        self.channels = channels
+        self.frame_bytes = chunk * channels * 2
+        self.jitter_buf = JitterBuffer(frame_ms=chunk * 1000 / rate, max_depth=max_depth)
+        self.concealer = CONCEALERS[plc](chunk, channels, rate)
+        self.noise = ComfortNoise(chunk, channels)
+        self.decoders = {}  # 编码 id -> 解码器，按发送端实际使用的编码自动切换
+        self.codec = None   # 最近一个包的编码名
+        self.last_seen = time.monotonic()
+        self._report = [self.last_seen, 0, 0]  # 上次回报时间, received, lost
+
+    def __str__(self):
+        return f"{self.addr[0]}:{self.addr[1]} {self.codec or '-'} {self.jitter_buf.jitter:.0f}ms"
+
+    def handle(self, packet):
+        """处理一个数据报，返回 True 表示有帧被收下（环形缓冲槽位需要保留）"""
+        self.last_seen = time.monotonic()
+        seq, ts, codec_id, count = HEADER.unpack_from(packet)
+        if codec_id == CN_ID:
+            self.jitter_buf.mark_silence(seq, packet[HEADER.size])
+            return False
+        if count == 0:
+            return False
+        decoder = self.decoders.get(codec_id)
+        if decoder is None:
+            if codec_id not in CODEC_IDS:
+                return False  # 不支持的编码
+            decoder = self.decoders[codec_id] = CODEC_IDS[codec_id](self.channels)
+        self.codec = decoder.name
+        payload = packet[HEADER.size:]
+        size, rest = divmod(len(payload), count)
+        if rest:
+            return False
+        # 只存 (解码器, 切片, 槽位 token)，解码推迟到播放时；PCM 直接把切片交给声卡
+        token = self.ring.token()
+        frames = [(decoder, payload[i * size:(i + 1) * size], token) for i in range(count)]
+        return self.jitter_buf.put(seq, ts, frames) > 0
+
+    def report(self):
+        """到了回报时间就返回回报包（丢包率和抖动），供发送端调整聚合帧数"""
+        now = time.monotonic()
+        if now - self._report[0] < REPORT_INTERVAL:
+            return None
+        stats = self.jitter_buf.stats
+        d_recv, d_lost = stats["received"] - self._report[1], stats["lost"] - self._report[2]
+        self._report[:] = [now, stats["received"], stats["lost"]]
+        return REPORT.pack(REPORT_MAGIC, d_lost / max(1, d_recv + d_lost), self.jitter_buf.jitter)
+
+    def next_frame(self):
+        """取下一个播放周期的音频，不阻塞"""
+        item = self.jitter_buf.get(timeout=0)
+        if item is COMFORT_NOISE:
+            return self.concealer.process(self.noise.frame(self.jitter_buf.noise_level))
+        data = None
+        if item is not None and self.ring.valid(item[2]):
+            data = item[0].decode(item[1])
+            if memoryview(data).nbytes != self.frame_bytes:
+                data = None  # 发送端帧长与本端不一致，按丢帧处理
+        return self.concealer.process(data)
+
+
+# 混音
+class Mixer:
+    """int32 累加多路 int16 帧并限幅；只有一路时原样直通"""
+
+    def __init__(self, chunk, channels):
+        self._acc = np.zeros(chunk * channels, dtype=np.int32)
+        self._out = np.zeros(chunk * channels, dtype=np.int16)
+        self._view = memoryview(self._out).cast("B").toreadonly()  # 字节格式，PyAudio 按 len() 计帧
+        self.silence = self._out.tobytes()
+
+    def mix(self, frames):
+        if not frames:
+            return self.silence
+        if len(frames) == 1:
+            return frames[0]
+        acc = self._acc
+        acc[:] = np.frombuffer(frames[0], dtype=np.int16)
+        for frame in frames[1:]:
+            acc += np.frombuffer(frame, dtype=np.int16)
+        np.clip(acc, -32768, 32767, out=acc)
+        self._out[:] = acc
+        return self._view
+
+
+# 接收流水线
+class ReceivePipeline:
+    """接收端核心：把数据报分给各发送端、生成回报、每个播放周期取帧混音；不做任何 IO
+
+    senders 可传入一个 dict，作为 地址 -> RemoteStream 的实时表供界面读取。
+    """
+
+    def __init__(self, rate, channels, chunk, max_depth=100, plc="waveform", senders=None,
+                 max_senders=8, sender_timeout=3.0):
+        self.ring = PacketRing(2 * (max_depth + MAX_BATCH), HEADER.size + MAX_BATCH * chunk * channels * 2 + 1)
+        self.mixer = Mixer(chunk, channels)
+        self.senders = {} if senders is None else senders
+        self.max_senders = max_senders
+        self.sender_timeout = sender_timeout
+        self._stream_args = (rate, channels, chunk, max_depth, plc)
+        self._lock = threading.Lock()
+
+    def recv(self, sock):
+        """从套接字收一个数据报并处理，返回 (要发回的回报包或 None, 来源地址)"""
+        packet, addr = self.ring.recv(sock)
+        if len(packet) <= HEADER.size or len(packet) == self.ring.slot_size:
+            return None, addr  # 不完整或被截断的包
+        remote = self.senders.get(addr)
+        if remote is None:
+            if len(self.senders) >= self.max_senders:
+                return None, addr
+            remote = RemoteStream(addr, self.ring, *self._stream_args)
+            with self._lock:
+                self.senders[addr] = remote
+        if remote.handle(packet):
+            self.ring.advance()
+        return remote.report(), addr
+
+    def next_output(self):
+        """取一个播放周期的输出：各路取帧后混音，超时的发送端被移除"""
+        now = time.monotonic()
+        with self._lock:
+            for addr in [a for a, r in self.senders.items() if now - r.last_seen > self.sender_timeout]:
+                del self.senders[addr]
+            active = list(self.senders.values())
+        return self.mixer.mix([remote.next_frame() for remote in active])
+
+
+# 异步引擎
+class _ReportProtocol(asyncio.DatagramProtocol):
+    """发送端套接字：只接收接收端的回报"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def datagram_received(self, data, addr):
+        self.pipeline.on_report(data)
+
+    def error_received(self, exc):
+        pass  # 目标不可达等 ICMP 错误，不影响其他目标
+
+
+def _close_audio(stream, device):
+    if stream is not None:
         stream.stop_stream()
         stream.close()
-        p.terminate()
-        udp_socket.close()
+    if device is not None:
+        device.terminate()
 
-# 音频接收函数
-def audio_recv(port, rate, channels, chunk, MAXSIZE=100, FORMAT=pyaudio.paInt16):
-    p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT, channels=channels, rate=rate, output=True, frames_per_buffer=chunk * 2)
-    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    udp_socket.bind(("0.0.0.0", port))
-    audio_q = queue.Queue(maxsize=MAXSIZE)
-
-    def udp_receiver():
-        while True:
-            data, _ = udp_socket.recvfrom(16384)
-            try:
-                audio_q.put(data, timeout=0.1)
-            except queue.Full:
-                pass  # 丢弃过多的数据，防止阻塞
 
-    threading.Thread(target=udp_receiver, daemon=True).start()
+class AudioEngine:
+    """在后台线程里运行 asyncio 事件循环，统一管理多路收发流
+
+    每路流有名字，可从任意线程 start_send/start_recv/stop/restart，返回 concurrent.futures.Future。
+    阻塞的声卡读写放在每路流独占的单线程执行器里；停止时等当前读写完成后关闭声卡和套接字。
+    流的启动、停止和出错通过 listener(event, name, detail) 通知，listener 在引擎线程里调用。
+    """
+
+    def __init__(self, listener=None):
+        self.listener = listener
+        # 接收用 add_reader，Windows 默认的 ProactorEventLoop 不支持，所以各平台都用 SelectorEventLoop
+        self.loop = asyncio.SelectorEventLoop()
+        self._tasks = {}     # 名字 -> asyncio.Task
+        self._configs = {}   # 名字 -> (类型, 参数)，供 restart 使用
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    # ---------- 线程安全的接口 ----------
+    def start_send(self, name, receiver_ip, port, rate, channels, chunk, FORMAT=None, codec="pcm", batch=1,
+                   vad=False, device=None):
+        config = dict(receiver_ip=receiver_ip, port=port, rate=rate, channels=channels, chunk=chunk,
+                      FORMAT=FORMAT, codec=codec, batch=batch, vad=vad, device=device)
+        return self._submit(self._start(name, "send", config))
+
+    def start_recv(self, name, port, rate, channels, chunk, MAXSIZE=100, FORMAT=None, plc="waveform",
+                   senders=None, max_senders=8, sender_timeout=3.0, group=None, device=None):
+        config = dict(port=port, rate=rate, channels=channels, chunk=chunk, MAXSIZE=MAXSIZE, FORMAT=FORMAT,
+                      plc=plc, senders=senders, max_senders=max_senders, sender_timeout=sender_timeout,
+                      group=group, device=device)
+        return self._submit(self._start(name, "recv", config))
+
+    def stop(self, name):
+        return self._submit(self._stop(name))
+
+    def restart(self, name, **changes):
+        """用原参数（可部分修改）重启一路流"""
+        return self._submit(self._restart(name, changes))
+
+    def running(self, name):
+        return name in self._tasks
+
+    def join(self, name):
+        """阻塞直到这路流结束；流因错误结束时抛出该错误"""
+        return self._submit(self._join(name)).result()
+
+    def shutdown(self, timeout=2.0):
+        """停止所有流并结束事件循环"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._submit(self._stop_all()).result(timeout)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+
+    # ---------- 事件循环内部 ----------
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _emit(self, event, name, detail=""):
+        if self.listener is not None:
+            self.listener(event, name, detail)
+
+    async def _start(self, name, kind, config):
+        if name in self._tasks:
+            raise RuntimeError(f"{name} 已经在运行中")
+        self._configs[name] = (kind, config)
+        started = self.loop.create_future()
+        run = self._run_send if kind == "send" else self._run_recv
+        task = self.loop.create_task(run(config, started))
+        self._tasks[name] = task
+        task.add_done_callback(lambda t: self._finished(name, t))
+        # 声卡和套接字都就绪才算启动成功；启动失败时把原因抛给调用方
+        done, _ = await asyncio.wait({started, task}, return_when=asyncio.FIRST_COMPLETED)
+        if task in done:
+            task.result()
+        self._emit("started", name)
+
+    def _finished(self, name, task):
+        if self._tasks.get(name) is task:
+            del self._tasks[name]
+        if not task.cancelled() and task.exception() is not None:
+            self._emit("error", name, str(task.exception()))
+        else:
+            self._emit("stopped", name)
+
+    async def _stop(self, name):
+        task = self._tasks.get(name)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _stop_all(self):
+        await asyncio.gather(*(self._stop(name) for name in list(self._tasks)))
+
+    async def _restart(self, name, changes):
+        kind, config = self._configs[name]
+        await self._stop(name)
+        await self._start(name, kind, {**config, **changes})
+
+    async def _join(self, name):
+        task = self._tasks.get(name)
+        if task is not None:
+            result, = await asyncio.gather(task, return_exceptions=True)
+            if isinstance(result, Exception):
+                raise result
+
+    async def _run_send(self, cfg, started):
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=1)
+        device, own_device = cfg["device"], cfg["device"] is None
+        stream = transport = None
+        rate, channels, chunk = cfg["rate"], cfg["channels"], cfg["chunk"]
+        try:
+            if own_device:
+                device = await loop.run_in_executor(pool, PyAudioDevice)
+            stream = await loop.run_in_executor(pool, device.open_input, cfg["FORMAT"], channels, rate, chunk)
+            pipeline = SendPipeline(rate, channels, chunk, cfg["codec"], cfg["batch"], cfg["vad"])
+            # receiver_ip 可以是单个地址、逗号分隔的多个地址或组播地址；只采集编码一次，逐个目标发送
+            dests = cfg["receiver_ip"]
+            dests = parse_destinations(dests, cfg["port"]) if isinstance(dests, str) else list(dests)
+            dests = [(await loop.run_in_executor(pool, socket.gethostbyname, host), p) for host, p in dests]
+            # 绑定系统分配的临时端口；接收端把回报发回发送包的源地址，即这个端口
+            transport, _ = await loop.create_datagram_endpoint(lambda: _ReportProtocol(pipeline),
+                                                               local_addr=("0.0.0.0", 0))
+            if any(is_multicast(ip) for ip, _ in dests):
+                transport.get_extra_info("socket").setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            started.set_result(None)
+            print(f"开始发送音频数据... 目标: {dests}, 编码: {cfg['codec']}, 聚合: {cfg['batch']}, "
+                  f"静音检测: {cfg['vad']}")
+            while True:
+                data = await loop.run_in_executor(pool, stream.read, chunk, False)  # 从麦克风读取数据
+                for packet in pipeline.feed(data):
+                    for dest in dests:
+                        transport.sendto(packet, dest)  # 发送音频数据到接收端
+        finally:
+            if transport is not None:
+                transport.close()
+            await loop.run_in_executor(pool, _close_audio, stream, device if own_device else None)
+            pool.shutdown(wait=False)
+            print("停止发送音频数据...")
+
+    async def _run_recv(self, cfg, started):
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=1)
+        device, own_device = cfg["device"], cfg["device"] is None
+        stream = udp_socket = None
+        rate, channels, chunk = cfg["rate"], cfg["channels"], cfg["chunk"]
+        try:
+            if own_device:
+                device = await loop.run_in_executor(pool, PyAudioDevice)
+            stream = await loop.run_in_executor(pool, device.open_output, cfg["FORMAT"], channels, rate, chunk)
+            udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if cfg["group"]:
+                # 只有组播接收端共用端口；单播端口被占用时应当绑定失败，而不是悄悄抢走数据
+                udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            udp_socket.bind(("0.0.0.0", cfg["port"]))
+            if cfg["group"]:
+                mreq = struct.pack("4s4s", socket.inet_aton(cfg["group"]), socket.inet_aton("0.0.0.0"))
+                udp_socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+            udp_socket.setblocking(False)
+            pipeline = ReceivePipeline(rate, channels, chunk, cfg["MAXSIZE"], cfg["plc"], cfg["senders"],
+                                       cfg["max_senders"], cfg["sender_timeout"])
+            arrived = asyncio.Event()
 
+            # 可读时把积压的数据报一次收完，直接写进环形缓冲
+            def on_readable():
+                while True:
+                    try:
+                        report, addr = pipeline.recv(udp_socket)
+                    except OSError:
+                        return  # 已收空（或 ICMP 错误），等下次可读
+                    arrived.set()
+                    if report:
+                        try:
+                            udp_socket.sendto(report, addr)
+                        except OSError:
+                            pass
+
+            loop.add_reader(udp_socket.fileno(), on_readable)
+            started.set_result(None)
+            print("开始接收音频数据...")
+            while True:
+                if not pipeline.senders:
+                    arrived.clear()
+                    try:
+                        await asyncio.wait_for(arrived.wait(), 0.2)
+                    except asyncio.TimeoutError:
+                        pass
+                await loop.run_in_executor(pool, stream.write, pipeline.next_output())
+        finally:
+            if udp_socket is not None:
+                loop.remove_reader(udp_socket.fileno())
+                udp_socket.close()
+            await loop.run_in_executor(pool, _close_audio, stream, device if own_device else None)
+            pool.shutdown(wait=False)
+            print("停止接收音频数据...")
+
+
+def _run_blocking(start, name):
+    """在独立引擎里跑一路流，直到出错或 Ctrl+C"""
+    engine = AudioEngine()
     try:
-        print("开始接收音频数据...")
-        while True:
-            try:
-                data = audio_q.get(timeout=0.2)
-            except queue.Empty:
-                data = b'\x00' * (chunk * channels * 2)
-            stream.write(data)
+        start(engine).result()
+        engine.join(name)
     except KeyboardInterrupt:
-        print("停止接收音频数据...")
+        pass
     finally:
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
-        udp_socket.close()
+        engine.shutdown()
+
+
+# 音频发送函数
+def audio_send(receiver_ip, port, rate, channels, chunk, FORMAT=None, codec="pcm", batch=1,
+               vad=False, device=None):
+    _run_blocking(lambda engine: engine.start_send("send", receiver_ip, port, rate, channels, chunk, FORMAT,
+                                                   codec, batch, vad, device), "send")
+
+
+# 音频接收函数
+def audio_recv(port, rate, channels, chunk, MAXSIZE=100, FORMAT=None, plc="waveform",
+               senders=None, max_senders=8, sender_timeout=3.0, group=None, device=None):
+    """接收并混音播放；senders 可传入一个 dict，作为 地址 -> RemoteStream 的实时表供界面读取；
+    group 为组播地址时加入该组；device 默认为 PyAudio 声卡"""
+    _run_blocking(lambda engine: engine.start_recv("recv", port, rate, channels, chunk, MAXSIZE, FORMAT, plc,
+                                                   senders, max_senders, sender_timeout, group, device), "recv")
+
 
 # GUI 应用程序
 class AudioApp(tk.Tk):
@@ -72,6 +1152,7 @@ class AudioApp(tk.Tk):
         self.send_frame = ttk.LabelFrame(self, text="发送音频")
         self.send_frame.pack(pady=5, padx=5, fill="both", expand=True)
 
+        # 可填单个 IP、逗号分隔的多个 IP（可带 :端口）或组播地址
         ttk.Label(self.send_frame, text="接收端 IP:").grid(row=0, column=0, padx=2, pady=2, sticky="w")
         self.receiver_ip = ttk.Entry(self.send_frame, width=15)
         self.receiver_ip.grid(row=0, column=1, padx=2, pady=2)
@@ -82,8 +1163,23 @@ class AudioApp(tk.Tk):
         self.port_send.grid(row=1, column=1, padx=2, pady=2)
         self.port_send.insert(0, "50007")
 
+        ttk.Label(self.send_frame, text="编码:").grid(row=2, column=0, padx=2, pady=2, sticky="w")
+        self.codec = ttk.Combobox(self.send_frame, values=list(CODECS), state="readonly", width=8)
+        self.codec.grid(row=2, column=1, padx=2, pady=2, sticky="w")
+        self.codec.set("adpcm")
+
+        ttk.Label(self.send_frame, text="聚合:").grid(row=3, column=0, padx=2, pady=2, sticky="w")
+        # 128 帧 @ 24 kHz 约 5.3 ms 一帧，聚合 8 帧就超过 auto 遵守的 40 ms 延迟上限
+        self.batch = ttk.Combobox(self.send_frame, values=["1", "2", "4", "auto"], state="readonly", width=8)
+        self.batch.grid(row=3, column=1, padx=2, pady=2, sticky="w")
+        self.batch.set("auto")
+
+        self.vad = tk.BooleanVar(value=True)
+        ttk.Checkbutton(self.send_frame, text="静音时不发送", variable=self.vad).grid(
+            row=4, column=0, columnspan=2, padx=2, pady=2, sticky="w")
+
         self.send_button = ttk.Button(self.send_frame, text="开始发送", command=self.start_send, width=10)
-        self.send_button.grid(row=2, column=0, columnspan=2, pady=5)
+        self.send_button.grid(row=5, column=0, columnspan=2, pady=5)
 
         # 接收音频部分
         self.recv_frame = ttk.LabelFrame(self, text="接收音频")
@@ -94,15 +1190,33 @@ class AudioApp(tk.Tk):
         self.port_recv.grid(row=0, column=1, padx=2, pady=2)
         self.port_recv.insert(0, "50007")
 
+        ttk.Label(self.recv_frame, text="组播:").grid(row=1, column=0, padx=2, pady=2, sticky="w")
+        self.group_recv = ttk.Entry(self.recv_frame, width=15)
+        self.group_recv.grid(row=1, column=1, padx=2, pady=2)
+
         self.recv_button = ttk.Button(self.recv_frame, text="开始接收", command=self.start_recv, width=10)
-        self.recv_button.grid(row=1, column=0, columnspan=2, pady=5)
+        self.recv_button.grid(row=2, column=0, columnspan=2, pady=5)
+
+        self.sender_list = tk.Listbox(self.recv_frame, height=3, font=("Helvetica", 8))
+        self.sender_list.grid(row=3, column=0, columnspan=2, padx=2, pady=2, sticky="we")
 
-        self.send_thread = None
-        self.recv_thread = None
+        self.senders = {}  # 接收流维护的 地址 -> RemoteStream
+        # 收发流都跑在引擎的事件循环里；引擎事件经队列转回界面线程
+        self.events = queue.Queue()
+        self.engine = AudioEngine(listener=lambda *event: self.events.put(event))
+        self.codec.bind("<<ComboboxSelected>>", self.update_send_options)
+        self.batch.bind("<<ComboboxSelected>>", self.update_send_options)
+        self.vad.trace_add("write", self.update_send_options)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(100, self.poll_events)
+        self.after(1000, self.update_senders)
+
+    def send_options(self):
+        return {"codec": self.codec.get(), "batch": self.batch.get(), "vad": self.vad.get()}
 
     def start_send(self):
-        if self.send_thread and self.send_thread.is_alive():
-            messagebox.showwarning("警告", "音频发送已经在运行中！")
+        if self.engine.running("send"):
+            self.engine.stop("send")
             return
 
         receiver_ip = self.receiver_ip.get()
@@ -110,26 +1224,53 @@ class AudioApp(tk.Tk):
         rate = 24000
         channels = 1
         chunk = 128
+        self.send_button.config(text="启动中...")
+        self.engine.start_send("send", receiver_ip, port, rate, channels, chunk, **self.send_options())
 
-        self.send_thread = threading.Thread(target=audio_send, args=(receiver_ip, port, rate, channels, chunk), daemon=True)
-        self.send_thread.start()
-        messagebox.showinfo("提示", "音频发送已开始！")
+    def update_send_options(self, *args):
+        """发送中修改编码、聚合或静音检测时，用新参数重启发送流"""
+        if self.engine.running("send"):
+            self.engine.restart("send", **self.send_options())
 
     def start_recv(self):
-        if self.recv_thread and self.recv_thread.is_alive():
-            messagebox.showwarning("警告", "音频接收已经在运行中！")
+        if self.engine.running("recv"):
+            self.engine.stop("recv")
             return
 
         port = int(self.port_recv.get())
+        group = self.group_recv.get().strip() or None
         rate = 24000
         channels = 1
         chunk = 128
+        self.recv_button.config(text="启动中...")
+        self.engine.start_recv("recv", port, rate, channels, chunk, senders=self.senders, group=group)
+
+    def poll_events(self):
+        """处理引擎发来的启动/停止/出错事件"""
+        buttons = {"send": (self.send_button, "发送"), "recv": (self.recv_button, "接收")}
+        while True:
+            try:
+                event, name, detail = self.events.get_nowait()
+            except queue.Empty:
+                break
+            button, action = buttons[name]
+            button.config(text=f"停止{action}" if event == "started" else f"开始{action}")
+            if event == "error":
+                messagebox.showerror("错误", f"音频{action}失败：{detail}")
+        self.after(100, self.poll_events)
+
+    def update_senders(self):
+        """刷新正在发送的来源列表"""
+        items = [str(remote) for remote in list(self.senders.values())] or ["(无发送端)"]
+        if list(self.sender_list.get(0, "end")) != items:
+            self.sender_list.delete(0, "end")
+            self.sender_list.insert("end", *items)
+        self.after(1000, self.update_senders)
 
-        self.recv_thread = threading.Thread(target=audio_recv, args=(port, rate, channels, chunk), daemon=True)
-        self.recv_thread.start()
-        messagebox.showinfo("提示", "音频接收已开始！")
+    def on_close(self):
+        self.engine.shutdown()
+        self.destroy()
 
 if __name__ == "__main__":
     app = AudioApp()
     app.mainloop()
-    
\ No newline at end of file
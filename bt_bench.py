@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""bt_gui 设备列表增量刷新的离线检查和基准，不需要显示器
+
+    python bt_bench.py diff --refreshes 500
+    python bt_bench.py churn --devices 40 --refreshes 200
+
+用一个按 Tk 语义实现 insert/move/delete 的假 Treeview 回放刷新，每次刷新后核对列表顺序和内容
+与 rows 一致，并统计 Tk 调用次数。
+"""
+import argparse, random, sys
+import bt_gui
+
+
+class FakeTree:
+    """按 ttk.Treeview 的语义维护顶层行：move 的位置按移走该行之后的列表计数"""
+
+    def __init__(self):
+        self.order = []
+        self.rows = {}
+        self.calls = {"insert": 0, "move": 0, "delete": 0, "item": 0}
+
+    def insert(self, parent, index, iid, text, values, tags):
+        self.calls["insert"] += 1
+        self.order.insert(index, iid)
+        self.rows[iid] = (text, tuple(values), tuple(tags))
+
+    def move(self, iid, parent, index):
+        self.calls["move"] += 1
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def delete(self, *iids):
+        self.calls["delete"] += len(iids)
+        for iid in iids:
+            self.order.remove(iid)
+            del self.rows[iid]
+
+    def item(self, iid, text, values, tags):
+        self.calls["item"] += 1
+        self.rows[iid] = (text, tuple(values), tuple(tags))
+
+
+class FakeApp:
+    """只带 _apply_rows 用到的属性"""
+    _apply_rows = bt_gui.BTApp._apply_rows
+
+    def __init__(self):
+        self.tree = FakeTree()
+        self._rows = {}
+        self._order = []
+
+
+def check(app, rows):
+    """返回列表与 rows 不一致的说明，一致时返回 None"""
+    want = [mac for mac, _ in rows]
+    if app.tree.order != want:
+        return f"顺序不符: {app.tree.order} != {want}"
+    if app._order != want:
+        return f"镜像顺序不符: {app._order} != {want}"
+    for mac, (text, values, tags) in rows:
+        if app.tree.rows[mac] != (text, tuple(values), tuple(tags)):
+            return f"{mac} 内容不符"
+    return None
+
+
+def replay(frames):
+    """依次应用每一帧 rows，返回 (出错的帧数, Tk 调用统计)"""
+    app, bad = FakeApp(), 0
+    for rows in frames:
+        app._apply_rows(rows)
+        error = check(app, rows)
+        if error:
+            bad += 1
+            print(error, file=sys.stderr)
+            app = FakeApp()  # 从空列表重来，避免一次出错带坏后面所有帧
+    return bad, app.tree.calls
+
+
+def random_frames(refreshes, devices, seed):
+    """随机的帧：一半只打乱上一帧的顺序，一半重新抽取（有增有删）"""
+    rng = random.Random(seed)
+    pool = [f"AA:BB:CC:DD:EE:{i:02X}" for i in range(devices * 2)]
+    frames, macs = [], []
+    for _ in range(refreshes):
+        if rng.random() < 0.5:
+            macs = rng.sample(macs, len(macs))
+        else:
+            macs = rng.sample(pool, rng.randint(0, devices))
+        frames.append([(mac, (f"dev {mac[-2:]}", (f"{rng.randint(-90, -40)} dBm",), ()))
+                       for mac in macs])
+    return frames
+
+
+def cache_frames(refreshes, devices, seed):
+    """DeviceCache.ordered() 在信号抖动下产生的帧"""
+    rng = random.Random(seed)
+    cache = bt_gui.DeviceCache()
+    rssi = {f"AA:BB:CC:DD:EE:{i:02X}": rng.randint(-90, -40) for i in range(devices)}
+    frames = []
+    for t in range(refreshes):
+        with cache.lock:
+            for mac, base in rssi.items():
+                if rng.random() < 0.9:  # 偶尔漏一次广播
+                    cache.sample(cache.entry(mac, now=t), base + rng.randint(-8, 8))
+        cache.expire(now=t)
+        frames.append([(mac, (name, (f"{r} dBm",), ("conn",) if conn else ()))
+                       for mac, name, r, conn in cache.ordered()])
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name, help in (("diff", "随机排列、增删后核对列表"), ("churn", "信号抖动下核对列表并统计 Tk 调用")):
+        p = sub.add_parser(name, help=help)
+        p.add_argument("--devices", type=int, default=40)
+        p.add_argument("--refreshes", type=int, default=500)
+        p.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    frames = (random_frames if args.cmd == "diff" else cache_frames)(args.refreshes, args.devices, args.seed)
+    bad, calls = replay(frames)
+    print(f"{args.cmd}: {len(frames)} 次刷新, 出错 {bad} 次, Tk 调用 "
+          + ", ".join(f"{k} {v}" for k, v in calls.items()))
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,371 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import subprocess, threading, time, tkinter as tk
+import os, re, shlex, subprocess, threading, time, tkinter as tk
 from tkinter import ttk, messagebox
+from ui_dispatch import UIDispatcher
+from refresh import RefreshScheduler
 
 WIN_SIZE = "240x320"
-REFRESH_MS = 5000  # 5 秒刷新
+REFRESH_MS = 5000  # 有变化或有操作时 5 秒刷新
+MAX_REFRESH_MS = 120000  # 列表一直不变时逐步退避到 2 分钟，并暂停设备发现
+DEVICE_TTL = 30       # 秒；超过这么久没收到广播的设备从列表中移除（已配对、已连接的除外）
+RSSI_ALPHA = 0.3      # 信号平滑系数，越小越平稳
+RSSI_HYSTERESIS = 6   # dBm；平滑后的信号强出这么多才和上一行交换位置
+STEP_TIMEOUTS = {"pair": 20, "trust": 5, "connect": 15, "disconnect": 5, "remove": 5,
+                 "rediscover": 15, "restart-audio": 10}  # 各步骤的超时（秒）
+DISCONNECT_WAIT = 4   # 秒；每一步之后等链路断开的最长时间
+SOUND_SERVER_RESTART = ["systemctl", "--user", "restart", "pulseaudio"]
+# 出现这些错误说明配对信息已失效，删除配对后完整重来一次
+REPAIR_ERRORS = ("AuthenticationFailed", "AuthenticationRejected", "key-missing", "not paired")
+# bluetoothctl 命令；没有蓝牙硬件时可换成模拟器：BLUETOOTHCTL="python3 fake_bluetoothctl.py"
+BLUETOOTHCTL = shlex.split(os.environ.get("BLUETOOTHCTL", "bluetoothctl"))
 
 def run(cmd, timeout=3):
-    """运行 shell 命令并返回 stdout 列表"""
+    """运行命令（shell 字符串或参数列表）并返回 stdout 列表"""
     try:
-        out = subprocess.check_output(cmd, shell=True, text=True, timeout=timeout, stderr=subprocess.DEVNULL)
+        out = subprocess.check_output(cmd, shell=isinstance(cmd, str), text=True, timeout=timeout,
+                                      stderr=subprocess.DEVNULL)
         return out.splitlines()
     except Exception:
         return []
 
-def scan_devices():
-    """返回 {mac: (name, rssi)}"""
-    run("bluetoothctl --timeout 5 scan on")  # 后台扫描 5 秒
-    lines = run("bluetoothctl devices")
-    devices = {}
-    for line in lines:
-        if line.startswith("Device "):
-            parts = line.split(maxsplit=2)
-            if len(parts) >= 3:
-                mac, name = parts[1], parts[2]
-                rssi = run(f"bluetoothctl info {mac} | grep RSSI")
-                rssi = int(rssi[0].split(":")[1]) if rssi else 0
-                devices[mac] = (name, rssi)
-    return devices
+# ---------- 设备缓存 ----------
+class DeviceCache:
+    """设备表：记录每个设备最后一次出现的时间、信号的指数滑动平均，并给出带滞回的排序
+
+    偶尔漏掉一次广播的设备在 ttl 内仍保留；行的先后只在平滑信号差距超过 hysteresis 时才改变。
+    """
+
+    def __init__(self, ttl=DEVICE_TTL, alpha=RSSI_ALPHA, hysteresis=RSSI_HYSTERESIS):
+        self.ttl = ttl
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.entries = {}  # mac -> {"name", "rssi", "ema", "seen", "found", "connected", "paired", "trusted"}
+        self.lock = threading.Lock()
+        self._order = []   # 上一次排序结果
+
+    def entry(self, mac, now=None):
+        """取设备条目（不存在则新建），并记为刚刚出现过；调用方需持有 lock"""
+        dev = self.entries.get(mac)
+        if dev is None:
+            dev = self.entries[mac] = {"name": mac.replace(":", "-"), "rssi": 0, "ema": None, "found": None,
+                                       "connected": False, "paired": False, "trusted": False}
+        dev["seen"] = time.monotonic() if now is None else now
+        return dev
+
+    def sample(self, dev, rssi):
+        """记录一次信号读数；调用方需持有 lock"""
+        dev["rssi"] = rssi
+        dev["ema"] = rssi if dev["ema"] is None else dev["ema"] + self.alpha * (rssi - dev["ema"])
+
+    def remove(self, mac):
+        with self.lock:
+            self.entries.pop(mac, None)
+
+    def expire(self, now=None):
+        """移除超过 ttl 未出现的设备，返回移除的个数"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            stale = [mac for mac, d in self.entries.items()
+                     if now - d["seen"] > self.ttl and not (d["connected"] or d["paired"])]
+            for mac in stale:
+                del self.entries[mac]
+        return len(stale)
+
+    def devices(self):
+        """返回 {mac: (name, 平滑后的 rssi)} 快照"""
+        with self.lock:
+            return {mac: (d["name"], self._rssi(d)) for mac, d in self.entries.items()}
+
+    def connected(self):
+        """返回当前所有已连接的 MAC 地址列表"""
+        with self.lock:
+            return [mac for mac, d in self.entries.items() if d["connected"]]
+
+    def ordered(self):
+        """返回排好序的 [(mac, name, rssi, connected)]
+
+        已连接→最前；只有 MAC 没有名字的沉底；同组内按平滑信号从强到弱，但已有的行只在
+        比上一行强出 hysteresis 时才往前挪，新出现的设备直接排到信号对应的位置。
+        """
+        with self.lock:
+            devs = self.entries
+            rows = {mac: (d["name"], self._rssi(d), d["connected"]) for mac, d in devs.items()}
+            strength = {mac: -200 if d["ema"] is None else d["ema"] for mac, d in devs.items()}  # 没有读数的排最后
+
+        def group(mac):
+            name, _, is_conn = rows[mac]
+            is_mac = len(name) == 17 and (name.count(':') == 5 or name.count('-') == 5)
+            return (not is_conn, is_mac)
+
+        known = {mac: i for i, mac in enumerate(self._order)}
+        out = []
+        for mac in sorted(rows, key=lambda m: (group(m), known.get(m, len(known)), -strength[m])):
+            margin = self.hysteresis if mac in known else 0
+            i = len(out)
+            while i and group(out[i - 1]) == group(mac) and strength[mac] > strength[out[i - 1]] + margin:
+                i -= 1
+            out.insert(i, mac)
+        self._order = out
+        return [(mac, *rows[mac]) for mac in out]
+
+    @staticmethod
+    def _rssi(dev):
+        return 0 if dev["ema"] is None else round(dev["ema"])
+
+# ---------- 常驻 bluetoothctl 会话 ----------
+ANSI = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]|[\x01\x02]")
+PROMPT = re.compile(r"^\[[^\]]*\][#>] ?")  # "[bluetooth]# "、"[JBL Flip 5]# "
+DEVICE = re.compile(r"^(?:\[(NEW|CHG|DEL)\] )?Device ((?:[0-9A-F]{2}:){5}[0-9A-F]{2}) ?(.*)$", re.I)
+RSSI = re.compile(r"(-?\d+)\)?$")  # "RSSI: -60" 或 "RSSI: 0xffffffc4 (-60)"
+
+class BluetoothSession:
+    """一个常驻的 bluetoothctl 进程和一个读线程，把流式输出解析成内存中的设备表
+
+    读线程处理 [NEW]/[CHG]/[DEL] 事件以及 devices、info 命令的回显，写入 DeviceCache；
+    进程意外退出时自动重启。
+    """
+
+    def __init__(self, cmd=None, cache=None):
+        self.cmd = cmd or BLUETOOTHCTL
+        self.cache = cache or DeviceCache()
+        self.proc = None
+        self._closed = False
+        self._info_mac = None  # 正在输出 info 的设备
+        self.discovering = True
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def send(self, command):
+        """向会话写一条命令；会话未就绪时忽略"""
+        try:
+            self.proc.stdin.write(command + "\n")
+            self.proc.stdin.flush()
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    def discover(self, on):
+        """打开或暂停设备发现（射频扫描是主要耗电）"""
+        if on != self.discovering:
+            self.discovering = on
+            self.send("scan on" if on else "scan off")
+
+    def devices(self):
+        """返回 {mac: (name, rssi)} 快照"""
+        return self.cache.devices()
+
+    def connected(self):
+        """返回当前所有已连接的 MAC 地址列表"""
+        return self.cache.connected()
+
+    def close(self):
+        self._closed = True
+        if self.proc is not None:
+            self.send("quit")
+            try:
+                self.proc.wait(1)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+    def _reader(self):
+        while not self._closed:
+            try:
+                self.proc = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL, text=True, errors="replace")
+            except OSError:
+                time.sleep(REFRESH_MS / 1000)  # 没有 bluetoothctl，稍后再试
+                continue
+            # 先列出已知设备（回显时逐个查 info），之后保持扫描，直到 discover(False)
+            self.send("devices")
+            if self.discovering:
+                self.send("scan on")
+            for line in self.proc.stdout:  # 文本模式下 \r 也按换行切分
+                self._parse(line)
+            self.proc.wait()
+            if not self._closed:
+                time.sleep(1)
+
+    def _parse(self, line):
+        line = ANSI.sub("", line).rstrip()
+        if line[:1] in ("\t", " ") and self._info_mac:
+            key, _, value = line.strip().partition(": ")
+            with self.cache.lock:
+                self._apply(self.cache.entry(self._info_mac), key, value)
+            return
+        line = PROMPT.sub("", line)
+        if not line:
+            return  # 只有提示符
+        m = DEVICE.match(line)
+        if not m:
+            self._info_mac = None
+            return
+        kind, mac, rest = m.group(1), m.group(2).upper(), m.group(3)
+        if kind == "DEL":
+            self.cache.remove(mac)
+            return
+        with self.cache.lock:
+            new = mac not in self.cache.entries
+            dev = self.cache.entry(mac)
+            if kind == "NEW":
+                dev["found"] = time.monotonic()  # 被扫描发现的时刻
+            if kind == "CHG":
+                key, _, value = rest.partition(": ")
+                self._apply(dev, key, value)
+            elif rest in ("(public)", "(random)"):
+                self._info_mac = mac  # info 输出的首行，后面是缩进的属性
+            else:
+                dev["name"] = rest or mac.replace(":", "-")
+                if new and kind is None:
+                    self.send(f"info {mac}")  # devices 列出的已知设备，查一次连接状态和信号
+
+    def _apply(self, dev, key, value):
+        if key in ("Name", "Alias"):
+            dev["name"] = value
+        elif key == "RSSI":
+            m = RSSI.search(value)
+            if m:
+                self.cache.sample(dev, int(m.group(1)))
+        elif key in ("Connected", "Paired", "Trusted"):
+            dev[key.lower()] = value == "yes"
+
+# ---------- 连接 ----------
+class ConnectEngine:
+    """按设备当前状态连接：已配对、已信任的跳过对应步骤，只有配对失效时才删除配对完整重来
+
+    状态取自 DeviceCache，每步成功后回写；每步有单独的超时，并记录耗时。
+    断开时只断选中的设备，确认链路真的断了才结束，断不开才逐级升级。
+    """
+
+    def __init__(self, cache, timeouts=STEP_TIMEOUTS, discover=None):
+        self.cache = cache
+        self.timeouts = timeouts
+        self.discover = discover  # discover(True) 打开设备发现，一般是 BluetoothSession.discover
+
+    def connect(self, mac):
+        """返回 (是否成功, 最后一步的输出, [(步骤, 是否成功, 耗时秒)])"""
+        steps = []
+        with self.cache.lock:
+            state = dict(self.cache.entries.get(mac, {}))
+        if state.get("connected"):
+            return True, "已连接", steps
+        ok, out = self._run_plan(mac, state, steps)
+        if not ok and any(err in out for err in REPAIR_ERRORS):
+            removed = time.monotonic()
+            self._step("remove", mac, steps)
+            # BlueZ 删除配对时连设备一起删掉，重新扫描发现之前 pair 只会报 not available
+            if not self._rediscover(mac, removed, steps):
+                return False, "删除配对后未能重新发现设备", steps
+            ok, out = self._run_plan(mac, {}, steps)
+        return ok, out, steps
+
+    def disconnect(self, mac, wait=DISCONNECT_WAIT):
+        """断开一个设备，返回 (是否已断开, [(步骤, 是否成功, 耗时秒)])
+
+        先 disconnect；等 wait 秒链路仍在才删除配对，再不行才重启声音服务，每级最多一次。
+        """
+        steps = []
+        for step in ("disconnect", "remove", "restart-audio"):
+            self._step(step, mac, steps)
+            if self._wait_disconnected(mac, wait):
+                return True, steps
+        return False, steps
+
+    def _connected(self, mac):
+        with self.cache.lock:
+            dev = self.cache.entries.get(mac)
+            return dev is not None and dev["connected"]
+
+    def _wait_disconnected(self, mac, wait):
+        # 连接状态由会话的 [CHG] Connected / [DEL] 事件更新
+        deadline = time.monotonic() + wait
+        while self._connected(mac):
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def _rediscover(self, mac, since, steps):
+        """打开设备发现，等 mac 在 since 之后被重新发现（[NEW] Device），最多等 rediscover 的超时"""
+        start = time.monotonic()
+        self.cache.remove(mac)  # 不等 [DEL]，旧条目不能当成重新发现
+        if self.discover:
+            self.discover(True)
+        deadline = start + self.timeouts["rediscover"]
+        while True:
+            with self.cache.lock:
+                dev = self.cache.entries.get(mac)
+                found = dev is not None and dev["found"] is not None and dev["found"] >= since
+            if found or time.monotonic() >= deadline:
+                steps.append(("rediscover", found, time.monotonic() - start))
+                return found
+            time.sleep(0.1)
+
+    def _run_plan(self, mac, state, steps):
+        out = ""
+        for step, flag in (("pair", "paired"), ("trust", "trusted"), ("connect", "connected")):
+            if state.get(flag):
+                continue
+            ok, out = self._step(step, mac, steps)
+            if not ok and not (step == "pair" and "AlreadyExists" in out):
+                return False, out
+        return True, out
+
+    def _step(self, step, mac, steps):
+        start = time.monotonic()
+        cmd = SOUND_SERVER_RESTART if step == "restart-audio" else [*BLUETOOTHCTL, step, mac]
+        try:
+            ret = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                 text=True, timeout=self.timeouts[step])
+            out = ret.stdout.strip()
+            ok = ret.returncode == 0 and "Failed" not in out
+        except (OSError, subprocess.TimeoutExpired):
+            ok, out = False, f"{step} 超时或无法执行"
+        steps.append((step, ok, time.monotonic() - start))
+        # 断开相关的状态只认会话上报的事件，这里不提前改
+        flag = {"pair": "paired", "trust": "trusted", "connect": "connected"}.get(step)
+        if ok or (step == "pair" and "AlreadyExists" in out):
+            with self.cache.lock:
+                dev = self.cache.entries.get(mac)
+                if dev is not None:
+                    if step == "remove":
+                        dev.update(paired=False, trusted=False)
+                    elif flag:
+                        dev[flag] = True
+        return ok, out
 
 def paired_devices():
     """返回 {mac: name} 已配对设备"""
-    lines = run("bluetoothctl paired-devices")
+    lines = run([*BLUETOOTHCTL, "paired-devices"])
     return {l.split()[1]: l.split(maxsplit=2)[2] for l in lines if l.startswith("Device")}
 
 def connect(mac):
-    run(f"bluetoothctl connect {mac}")
+    run([*BLUETOOTHCTL, "connect", mac])
 
 def disconnect(mac):
-    run(f"bluetoothctl disconnect {mac}")
+    run([*BLUETOOTHCTL, "disconnect", mac])
 
 def trust(mac):
-    run(f"bluetoothctl trust {mac}")
+    run([*BLUETOOTHCTL, "trust", mac])
+
+def _longest_increasing(position, order):
+    """order 中已在 position 里的元素，按 position 取最长递增子序列，返回其集合"""
+    tails, links = [], {}  # tails[k]: 长度 k+1 的递增子序列的末元素
+    for mac in order:
+        if mac not in position:
+            continue
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if position[tails[mid]] < position[mac]:
+                lo = mid + 1
+            else:
+                hi = mid
+        links[mac] = tails[lo - 1] if lo else None
+        tails[lo:lo + 1] = [mac]
+    result, mac = set(), tails[-1] if tails else None
+    while mac is not None:
+        result.add(mac)
+        mac = links[mac]
+    return result
 
 class BTApp(tk.Tk):
     def __init__(self):
@@ -63,6 +387,10 @@ class BTApp(tk.Tk):
         self.tree.configure(yscrollcommand=scroll.set)
         self.tree.pack(side="left", fill="both", expand=True)
         scroll.pack(side="right", fill="y")
+        # 绿色加粗已连接行
+        self.tree.tag_configure("conn", foreground="green", font=("Helvetica", 9, "bold"))
+        self._rows = {}   # 列表当前内容的镜像：mac -> (名称, 值, 标签)
+        self._order = []  # 列表当前顺序
 
         # 按钮
         btn_frm = tk.Frame(self, bg="#ffffff")
@@ -76,65 +404,84 @@ class BTApp(tk.Tk):
         self.conn_lbl = tk.Label(self, text="", font=("Helvetica", 9), bg="#ffffff")
         self.conn_lbl.pack(pady=1)
 
-        self.after(200, self.refresh_list)
-        self.after(REFRESH_MS, self.periodic_refresh)
-        self.after(REFRESH_MS, self.update_connected)
+        self.session = BluetoothSession()
+        self.connector = ConnectEngine(self.session.cache, discover=self.session.discover)
+        self.ui = UIDispatcher(self)  # 工作线程的结果都经它回到主线程
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # 列表不变时逐步放慢刷新，有变化或有操作时回到 REFRESH_MS
+        self.refresh = RefreshScheduler(self)
+        self.refresh.add("list", self._scan, REFRESH_MS, MAX_REFRESH_MS, delay_ms=200)
+        self.refresh.add("connected", self.update_connected, REFRESH_MS, MAX_REFRESH_MS, delay_ms=REFRESH_MS)
+        self.refresh.watch_input(self)
 
     def refresh_list(self):
-        self.status.config(text="扫描中...", fg="blue")
-        threading.Thread(target=self._scan, daemon=True).start()
+        # 设备表由会话的读线程持续更新，这里只是读一次快照，不再起进程
+        self.refresh.trigger("list")
 
     # ---------- 扫描 + 排序 ----------
     def _scan(self):
-        devices = scan_devices()  # mac -> (name, rssi)
-        connected_macs = self._get_connected_macs()  # 获取所有已连接设备的 MAC 地址
-        old_sel = self.tree.selection()
-
-        # 排序：已连接→最前；其余按名称；MAC 沉底
-        def sort_key(item):
-            mac, (name, _) = item
-            is_conn = mac in connected_macs
-            is_mac = len(name) == 17 and (name.count(':') == 5 or name.count('-') == 5)
-            return (not is_conn, is_mac, name.lower())
-
-        sorted_devices = sorted(devices.items(), key=sort_key)
+        cache = self.session.cache
+        # 暂停发现期间设备不再广播，不能按 DEVICE_TTL 过期
+        self.session.discover(not self.refresh.backed_off("list"))
+        if self.session.discovering:
+            cache.expire()  # 超过 DEVICE_TTL 没再出现的设备才移除
+        rows = cache.ordered()  # 已连接在前，其余按平滑后的信号排序（带滞回）
+        self.refresh.done("list", frozenset((mac, name, is_conn) for mac, name, _, is_conn in rows))
+        self._apply_rows([(mac, (name, (f"{rssi} dBm",), ("conn",) if is_conn else ()))
+                          for mac, name, rssi, is_conn in rows])
 
-        # 清空后重新插入
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for mac, (name, rssi) in sorted_devices:
-            is_conn = mac in connected_macs
-            tag = "conn" if is_conn else None
-            self.tree.insert("", "end", iid=mac, text=name,
-                             values=(f"{rssi} dBm",), tags=(tag,))
+        self.status.config(text=f"{len(rows)} 个设备")
 
-        # 绿色加粗已连接行
-        self.tree.tag_configure("conn", foreground="green", font=("Helvetica", 9, "bold"))
+    def _apply_rows(self, rows):
+        """按 mac 与当前列表比对，只对删除、新增、内容变化和位置变化的行调用 Tk
 
-        # 恢复选中
-        if old_sel and old_sel[0] in devices:
-            self.tree.selection_set(old_sel)
-
-        self.status.config(text=f"{len(devices)} 个设备")
+        rows 为排好序的 [(mac, (名称, 值, 标签))]。不变的行不产生任何 Tk 调用，选中和滚动位置也不受影响。
+        """
+        new = dict(rows)
+        gone = [mac for mac in self._order if mac not in new]
+        if gone:
+            self.tree.delete(*gone)
+        cur = [mac for mac in self._order if mac in new]
+        # 旧行中按新顺序排成的最长递增子序列原地不动，其余的挪到新顺序里前一行之后
+        stay = _longest_increasing({mac: i for i, mac in enumerate(cur)}, [mac for mac, _ in rows])
+        prev = None
+        for mac, row in rows:
+            if mac not in stay:
+                # Tk 的 move 按移走这一行之后的位置计数，所以先从镜像里拿掉再算位置
+                if mac in self._rows:
+                    cur.remove(mac)
+                index = cur.index(prev) + 1 if prev else 0
+                if mac in self._rows:
+                    self.tree.move(mac, "", index)
+                else:
+                    text, values, tags = row
+                    self.tree.insert("", index, iid=mac, text=text, values=values, tags=tags)
+                cur.insert(index, mac)
+            if self._rows.get(mac, row) != row:
+                text, values, tags = row
+                self.tree.item(mac, text=text, values=values, tags=tags)
+            prev = mac
+        self._rows, self._order = new, cur
 
     # ---------- 底部实时显示 ----------
     def update_connected(self):
         connected_macs = self._get_connected_macs()
         if connected_macs:
+            devices = self.session.devices()
             names = []
             for mac in connected_macs:
-                name = self.tree.item(mac, "text")
+                name = devices.get(mac, (mac,))[0]
                 names.append(f"{name} ({mac})")
             self.conn_lbl.config(text=f"已连接: {', '.join(names)}", fg="green")
         else:
             self.conn_lbl.config(text="未连接", fg="gray")
-        self.after(REFRESH_MS, self.update_connected)
+        self.refresh.done("connected", frozenset(connected_macs))
 
     # ---------- 工具 ----------
     def _get_connected_macs(self):
         """返回当前所有已连接的 MAC 地址列表"""
-        lines = run("bluetoothctl info | grep 'Connected: yes' -B 2")
-        return [line.split()[1] for line in lines if line.startswith("Device")]
+        return self.session.connected()
 
     def _find_item(self, mac):
         return mac if mac in self.tree.get_children() else None
@@ -147,48 +494,52 @@ class BTApp(tk.Tk):
             return
         mac = mac[0]
         name = self.tree.item(mac, "text")
-        self.status.config(text="正在配对 & 连接...", fg="blue")
-
-        def do_pair():
-            # 1. 配对
-            ret1 = subprocess.run(["bluetoothctl", "pair", mac],
-                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            # 2. 信任
-            subprocess.run(["bluetoothctl", "trust", mac])
-            # 3. 连接
-            ret3 = subprocess.run(["bluetoothctl", "connect", mac])
-
-            if ret3.returncode == 0:
-                self.after(0, lambda: self.conn_lbl.config(text=f"已连接: {name}", fg="green"))
+        self.status.config(text="正在连接...", fg="blue")
+
+        def do_connect():
+            ok, out, steps = self.connector.connect(mac)
+            timing = " ".join(f"{step} {dt:.1f}s" for step, _, dt in steps) or "无需操作"
+            print(f"连接 {mac}: {'成功' if ok else '失败'} ({timing})")
+            if ok:
+                self.ui.call(lambda: (self.conn_lbl.config(text=f"已连接: {name}", fg="green"),
+                                      self.status.config(text=timing, fg="black")))
             else:
-                # 捕获配对失败信息
-                err = ret1.stderr or ret1.stdout
-                self.after(0, lambda: messagebox.showerror("连接失败", err))
+                self.ui.call(lambda: (self.status.config(text=timing, fg="red"),
+                                      messagebox.showerror("连接失败", out)))
 
-        threading.Thread(target=do_pair, daemon=True).start()
+        threading.Thread(target=do_connect, daemon=True).start()
 
-    # ---------- 可靠断开 ----------
+    # ---------- 断开 ----------
     def disconnect(self):
+        sel = self.tree.selection()
         connected_macs = self._get_connected_macs()
         if not connected_macs:
             messagebox.showinfo("提示", "未发现已连接设备")
             return
-        # 先正常断开
+        if not sel or sel[0] not in connected_macs:
+            messagebox.showwarning("提示", "请选择要断开的已连接设备")
+            return
+        mac = sel[0]
+        name = self.tree.item(mac, "text")
         self.status.config(text="正在断开...", fg="blue")
-        for mac in connected_macs:
-            subprocess.run(["bluetoothctl", "disconnect", mac])
-        # 强制移除确保彻底断开
-        def hard_remove():
-            for mac in connected_macs:
-                subprocess.run(["bluetoothctl", "remove", mac])
-                subprocess.run(["systemctl", "--user", "restart", "pulseaudio"],
-                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        threading.Thread(target=hard_remove, daemon=True).start()
-        self.after(500, self.conn_lbl.config(text="已断开", fg="blue"))
-
-    def periodic_refresh(self):
-        self.refresh_list()
-        self.after(REFRESH_MS, self.periodic_refresh)
+
+        def do_disconnect():
+            ok, steps = self.connector.disconnect(mac)
+            timing = " ".join(f"{step} {dt:.1f}s" for step, _, dt in steps)
+            print(f"断开 {mac}: {'成功' if ok else '失败'} ({timing})")
+            if ok:
+                self.ui.call(lambda: (self.conn_lbl.config(text=f"已断开: {name}", fg="blue"),
+                                      self.status.config(text=timing, fg="black")))
+            else:
+                self.ui.call(lambda: (self.status.config(text=timing, fg="red"),
+                                      messagebox.showerror("断开失败", f"{name} 仍处于连接状态")))
+
+        threading.Thread(target=do_disconnect, daemon=True).start()
+
+    def on_close(self):
+        self.refresh.stop()
+        self.session.close()
+        self.destroy()
 
 if __name__ == "__main__":
     BTApp().mainloop()
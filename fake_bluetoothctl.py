@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""模拟 bluetoothctl，用于在没有蓝牙硬件时测试 bt_gui
+
+    BLUETOOTHCTL="python3 fake_bluetoothctl.py" python3 bt_gui.py
+
+交互模式（无参数）读取 stdin 命令，像真机一样输出带颜色的 [NEW]/[CHG]/[DEL] 事件；
+带参数时执行单条命令后退出（如 fake_bluetoothctl.py connect AA:BB:...）。
+环境变量：
+    FAKE_BT_DEVICES   模拟的广播设备数，默认 40
+    FAKE_BT_SEED      随机种子，默认 0
+    FAKE_BT_INTERVAL  事件间隔（秒），默认 0.2
+    FAKE_BT_STATE     状态文件（JSON），多个进程间共享配对/信任/连接状态
+    FAKE_BT_SCRIPT    回放脚本：每行 "延时秒数<TAB>输出行"，放完后继续按模拟输出
+    FAKE_BT_FAIL      逗号分隔的 命令:MAC 列表，这些操作返回失败（如 "connect:AA:BB:CC:DD:EE:01"）
+状态文件中设备带 "stale": true 表示配对密钥已失效，connect 会失败，直到 remove 后重新配对。
+和 BlueZ 一样，remove 把设备一起删掉（状态文件中记为 "hidden": true），之后的命令报 not available，
+直到交互模式在扫描中重新发现它。
+"""
+import json, os, random, select, sys, time
+
+COLORS = {"NEW": "\x1b[0;92m", "CHG": "\x1b[0;93m", "DEL": "\x1b[0;91m"}
+RESET = "\x1b[0m"
+PROMPT = "\x1b[0;94m[bluetooth]\x1b[0m# "
+CONTROLLER = "00:1A:7D:DA:71:00"
+NAMES = ["JBL Flip 5", "Mi Band 6", "AirPods Pro", "Galaxy Buds", "小米手环", "HUAWEI FreeBuds",
+         "MX Keys", "Logitech M720", "Sony WH-1000XM4", "BOSE QC35", "Redmi K40", "iPhone"]
+
+
+def make_world(count, seed):
+    """返回 {mac: 设备}；约四分之一的设备只有 MAC 没有名字"""
+    rng = random.Random(seed)
+    world = {}
+    for i in range(count):
+        mac = "AA:BB:CC:%02X:%02X:%02X" % (i >> 8, i & 0xFF, rng.randrange(256))
+        name = f"{rng.choice(NAMES)} {i}" if rng.random() > 0.25 else mac.replace(":", "-")
+        world[mac] = {"name": name, "rssi": rng.randint(-95, -40), "visible": False}
+    return world
+
+
+# ---------- 共享状态 ----------
+def load_state():
+    path = os.environ.get("FAKE_BT_STATE")
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    path = os.environ.get("FAKE_BT_STATE")
+    if path:
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+
+
+def failing(cmd, mac):
+    return f"{cmd}:{mac}" in os.environ.get("FAKE_BT_FAIL", "").split(",")
+
+
+# ---------- 命令 ----------
+def execute(cmd, args, world, out):
+    """执行一条命令，返回退出码"""
+    state = load_state()
+    mac = args[0] if args else ""
+    flags = state.setdefault(mac, {}) if mac else {}
+    if cmd == "devices":
+        which = args[0] if args else None
+        for m, dev in world.items():
+            if state.get(m, {}).get("hidden"):
+                continue
+            if which is None or state.get(m, {}).get(which.lower()):
+                out(f"Device {m} {dev['name']}")
+        return 0
+    if cmd == "paired-devices":
+        return execute("devices", ["Paired"], world, out)
+    if mac and (mac not in world or flags.get("hidden")):
+        out(f"Device {mac} not available")
+        return 1
+    if cmd == "info":
+        dev = world[mac]
+        out(f"Device {mac} (public)")
+        out(f"\tName: {dev['name']}")
+        for key in ("Paired", "Trusted", "Connected"):
+            out(f"\t{key}: {'yes' if flags.get(key.lower()) else 'no'}")
+        out(f"\tRSSI: {dev['rssi']}")
+        return 0
+    if cmd in ("pair", "trust", "connect", "disconnect") and failing(cmd, mac):
+        reason = {"pair": "org.bluez.Error.AuthenticationFailed", "trust": "org.bluez.Error.Failed",
+                  "connect": "org.bluez.Error.Failed br-connection-page-timeout",
+                  "disconnect": "org.bluez.Error.InProgress"}[cmd]
+        out(f"Failed to {cmd}: {reason}")
+        return 1
+    if cmd == "pair":
+        if flags.get("paired"):
+            out("Failed to pair: org.bluez.Error.AlreadyExists")
+            return 1
+        flags["paired"] = True
+        out("Pairing successful")
+    elif cmd == "trust":
+        flags["trusted"] = True
+        out(f"Changing {mac} trust succeeded")
+    elif cmd == "connect":
+        if flags.get("stale"):
+            out("Failed to connect: org.bluez.Error.Failed br-connection-key-missing")
+            return 1
+        flags["connected"] = flags["paired"] = True
+        out("Connection successful")
+    elif cmd == "disconnect":
+        flags["connected"] = False
+        out("Successful disconnected")
+    elif cmd == "remove":
+        state[mac] = {"hidden": True}
+        out("Device has been removed")
+    else:
+        out(f"Invalid command {cmd}")
+        return 1
+    save_state(state)
+    return 0
+
+
+# ---------- 交互模式 ----------
+def interactive(world, rng):
+    def out(line):
+        sys.stdout.write("\r" + line + "\n" + PROMPT)
+        sys.stdout.flush()
+
+    def event(kind, text):
+        out(f"{COLORS[kind]}[{kind}]{RESET} {text}")
+
+    script = []
+    if os.environ.get("FAKE_BT_SCRIPT"):
+        with open(os.environ["FAKE_BT_SCRIPT"], encoding="utf-8") as f:
+            script = [line.rstrip("\n").split("\t", 1) for line in f if "\t" in line]
+    interval = float(os.environ.get("FAKE_BT_INTERVAL", "0.2"))
+    scanning = False
+    connected = {m for m, flags in load_state().items() if flags.get("connected")}
+    event("NEW", f"Controller {CONTROLLER} fake [default]")
+    next_tick = time.monotonic()
+    pending = b""
+    while True:
+        timeout = max(0.0, next_tick - time.monotonic())
+        if select.select([sys.stdin], [], [], timeout)[0]:
+            data = os.read(sys.stdin.fileno(), 4096)
+            if not data:
+                return
+            pending += data
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                parts = line.decode("utf-8", "replace").split()
+                if not parts:
+                    continue
+                if parts[0] in ("quit", "exit"):
+                    return
+                if parts[:2] == ["scan", "on"]:
+                    scanning = True
+                    out("Discovery started")
+                    event("CHG", f"Controller {CONTROLLER} Discovering: yes")
+                elif parts[:2] == ["scan", "off"]:
+                    scanning = False
+                    event("CHG", f"Controller {CONTROLLER} Discovering: no")
+                else:
+                    execute(parts[0], parts[1:], world, out)
+            continue
+        next_tick += interval
+        if script:
+            delay, text = script.pop(0)
+            next_tick += float(delay)
+            out(text)
+            continue
+        # 别的进程改了连接状态，或删掉了设备
+        state = load_state()
+        now = {m for m, flags in state.items() if flags.get("connected")}
+        for mac in now - connected:
+            event("CHG", f"Device {mac} Connected: yes")
+        for mac in connected - now:
+            event("CHG", f"Device {mac} Connected: no")
+        connected = now
+        hidden = [m for m, flags in state.items() if flags.get("hidden") and m in world]
+        for mac in hidden:
+            dev = world[mac]
+            if dev["visible"]:
+                dev["visible"] = False
+                event("DEL", f"Device {mac} {dev['name']}")
+            elif scanning:  # 删除后的下一轮扫描重新发现
+                dev["visible"] = True
+                del state[mac]
+                event("NEW", f"Device {mac} {dev['name']}")
+        if hidden and scanning:
+            save_state(state)
+        if not scanning:
+            continue
+        mac = rng.choice(list(world))
+        dev = world[mac]
+        if not dev["visible"]:
+            dev["visible"] = True
+            event("NEW", f"Device {mac} {dev['name']}")
+        elif rng.random() < 0.03 and mac not in connected:
+            dev["visible"] = False
+            event("DEL", f"Device {mac} {dev['name']}")
+        else:
+            dev["rssi"] = max(-100, min(-30, dev["rssi"] + rng.randint(-6, 6)))
+            value = dev["rssi"] & 0xFFFFFFFF
+            event("CHG", f"Device {mac} RSSI: 0x{value:08x} ({dev['rssi']})")
+
+
+def main(argv):
+    world = make_world(int(os.environ.get("FAKE_BT_DEVICES", "40")), int(os.environ.get("FAKE_BT_SEED", "0")))
+    # --timeout N 之类的选项不影响模拟
+    while argv and argv[0].startswith("--"):
+        argv = argv[2:]
+    if not argv:
+        try:
+            interactive(world, random.Random(os.environ.get("FAKE_BT_SEED", "0")))
+        except (KeyboardInterrupt, BrokenPipeError):
+            pass  # 父进程退出或关掉了管道
+        return 0
+    for mac in world:
+        world[mac]["visible"] = True
+    return execute(argv[0], argv[1:], world, print)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
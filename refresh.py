@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""自适应刷新调度：替代各界面里固定间隔的 after 定时器链
+
+每个数据源（如 Wi-Fi 扫描、蓝牙列表）登记一个 start 函数，由调度器在主线程里按间隔调用；
+start 把活交给工作线程，结果回到主线程后调用 done(name, signature) 报告结束。
+
+- 同一个源同一时间只有一次在途；期间的 trigger 只记下来，结束后立即补跑一次
+- 结果的 signature 和上次相同则间隔按 factor 翻倍，直到 slow_ms；不同则回到 fast_ms
+- 用户操作（poke）也回到 fast_ms
+- 使用电池时间隔再乘 battery_factor
+"""
+import glob, os, sys, time
+
+FAST_MS = 5000       # 有变化或有操作时的刷新间隔
+SLOW_MS = 120000     # 结果一直不变时退避到的最长间隔
+BACKOFF = 2.0        # 每次结果不变间隔乘以的倍数
+BATTERY_FACTOR = 2   # 使用电池时间隔再乘以的倍数
+POWER_CHECK_S = 60   # 电源状态的查询间隔（秒）
+
+
+def on_battery():
+    """Linux 上有电池在放电时返回 True；读不到电源信息时返回 False"""
+    if not sys.platform.startswith("linux"):
+        return False
+    for path in glob.glob("/sys/class/power_supply/*"):
+        try:
+            with open(os.path.join(path, "type")) as f:
+                if f.read().strip() != "Battery":
+                    continue
+            with open(os.path.join(path, "status")) as f:
+                if f.read().strip() == "Discharging":
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+class _Source:
+    def __init__(self, start, fast_ms, slow_ms):
+        self.start = start
+        self.fast_ms = fast_ms   # 毫秒数，或返回毫秒数的函数（随运行状态变化时用）
+        self.slow_ms = slow_ms
+        self.interval = None     # 当前间隔（不含电池倍数）；None 表示还没跑过
+        self.signature = None
+        self.busy = False
+        self.pending = None      # 在途期间又被 trigger 时的参数
+        self.job = None
+        self.due = None          # 下次定时刷新的时刻（monotonic）
+        self.stats = {"runs": 0, "coalesced": 0, "changed": 0, "unchanged": 0, "pokes": 0}
+
+    def fast(self):
+        return self.fast_ms() if callable(self.fast_ms) else self.fast_ms
+
+
+class RefreshScheduler:
+    def __init__(self, root, factor=BACKOFF, battery_factor=BATTERY_FACTOR, clock=time.monotonic):
+        self.root = root
+        self.factor = factor
+        self.battery_factor = battery_factor
+        self.clock = clock
+        self._sources = {}
+        self._battery = (False, None)  # (是否用电池, 查询时刻)
+
+    def add(self, name, start, fast_ms=FAST_MS, slow_ms=SLOW_MS, delay_ms=0):
+        """（主线程）登记数据源，delay_ms 后第一次刷新；start(*args) 结束时必须调用 done(name, ...)"""
+        self._sources[name] = _Source(start, fast_ms, slow_ms)
+        self._schedule(name, delay_ms)
+
+    def trigger(self, name, *args):
+        """（主线程）马上刷新一次；在途时合并到这次结束之后"""
+        src = self._sources[name]
+        if src.busy:
+            src.pending = args
+            src.stats["coalesced"] += 1
+            return
+        self._cancel(src)
+        src.busy = True
+        src.stats["runs"] += 1
+        src.start(*args)
+
+    def done(self, name, signature):
+        """（主线程）报告一次刷新的结果；signature 用来判断结果是否变化，应可用 == 比较"""
+        src = self._sources[name]
+        src.busy = False
+        fast = src.fast()
+        if src.interval is not None and signature == src.signature:
+            src.stats["unchanged"] += 1
+            src.interval = min(max(src.interval * self.factor, fast), max(src.slow_ms, fast))
+        else:
+            src.stats["changed"] += 1
+            src.interval = fast
+        src.signature = signature
+        if src.pending is not None:
+            args, src.pending = src.pending, None
+            self.trigger(name, *args)
+        else:
+            self._schedule(name, self._scaled(src.interval))
+
+    def poke(self, *names):
+        """（主线程）用户有操作：间隔回到 fast_ms，已排得更晚的定时刷新提前；不给 names 时作用于全部"""
+        for name in names or list(self._sources):
+            src = self._sources[name]
+            src.stats["pokes"] += 1
+            fast = src.fast()
+            if src.interval is None or src.interval <= fast:
+                continue
+            src.interval = fast
+            delay = self._scaled(fast)
+            if not src.busy and src.due is not None and src.due - self.clock() > delay / 1000:
+                self._schedule(name, delay)
+
+    def watch_input(self, widget):
+        """把 widget 所在窗口的鼠标和按键都当作用户操作"""
+        for seq in ("<ButtonPress>", "<KeyPress>"):
+            widget.bind_all(seq, lambda e: self.poke(), add="+")
+
+    def interval(self, name):
+        """当前实际使用的间隔（毫秒，含电池倍数）"""
+        src = self._sources[name]
+        return self._scaled(src.interval if src.interval is not None else src.fast())
+
+    def backed_off(self, name):
+        """结果一直不变，间隔已退避到 slow_ms"""
+        src = self._sources[name]
+        return src.interval is not None and src.interval >= max(src.slow_ms, src.fast())
+
+    @property
+    def stats(self):
+        return {name: dict(src.stats, interval_ms=self.interval(name), busy=src.busy)
+                for name, src in self._sources.items()}
+
+    def stop(self):
+        for src in self._sources.values():
+            self._cancel(src)
+
+    def _scaled(self, ms):
+        now = self.clock()
+        battery, checked = self._battery
+        if checked is None or now - checked >= POWER_CHECK_S:
+            battery = on_battery()
+            self._battery = (battery, now)
+        return int(ms * self.battery_factor) if battery else int(ms)
+
+    def _schedule(self, name, delay_ms):
+        src = self._sources[name]
+        self._cancel(src)
+        src.due = self.clock() + delay_ms / 1000
+        src.job = self.root.after(delay_ms, lambda: self._fire(name))
+
+    def _fire(self, name):
+        self._sources[name].job = None
+        self.trigger(name)
+
+    def _cancel(self, src):
+        if src.job is not None:
+            self.root.after_cancel(src.job)
+            src.job = None
+        src.due = None
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""工作线程 -> Tk 主线程的界面更新队列
+
+Tkinter 只能在主线程里调用。工作线程只调用 post/call 把结果放进队列，主线程用一个 after 定时器
+统一取出执行；同一个 key 在一个周期内多次 post 只处理最后一次，合并成一次重绘。
+"""
+import queue, sys
+
+
+class UIDispatcher:
+    def __init__(self, root, interval_ms=50):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._queue = queue.SimpleQueue()
+        self._handlers = {}  # key -> handler(snapshot)
+        self._job = root.after(interval_ms, self._tick)
+
+    def register(self, key, handler):
+        """（主线程）登记 key 的处理函数，handler(snapshot) 在主线程中执行"""
+        self._handlers[key] = handler
+
+    def post(self, key, snapshot):
+        """（任意线程）投递 key 的最新结果；snapshot 应是不可变对象（元组等），投递后不再修改"""
+        self._queue.put((key, snapshot))
+
+    def call(self, func, *args):
+        """（任意线程）让主线程执行一次 func(*args)，不参与合并"""
+        self._queue.put((object(), (func, args)))
+
+    def stop(self):
+        self.root.after_cancel(self._job)
+
+    def _tick(self):
+        # 按最后一次投递的先后排列；同 key 只留最新的一份
+        pending = {}
+        while True:
+            try:
+                key, item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            pending.pop(key, None)
+            pending[key] = item
+        for key, item in pending.items():
+            try:
+                if key in self._handlers:
+                    self._handlers[key](item)
+                else:
+                    func, args = item
+                    func(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        self._job = self.root.after(self.interval_ms, self._tick)
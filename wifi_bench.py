@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""wifi_gui 扫描后端的离线基准测试，使用录制的 nmcli 输出
+
+    python wifi_bench.py gen --networks 500 > fixtures/nmcli_wifi_500.txt
+    python wifi_bench.py record fixtures/nmcli_wifi_local.txt
+    python wifi_bench.py parse fixtures/*.txt
+    python wifi_bench.py scan --fixture fixtures/nmcli_wifi_500.txt --rescan yes
+    python wifi_bench.py profiles --profiles 50
+"""
+import argparse, glob, os, random, subprocess, sys, time
+import wifi_gui
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+WORDS = ["Office", "Guest", "HUAWEI", "TP-LINK", "CMCC", "ChinaNet", "Xiaomi", "教师", "实验室", "Cafe",
+         "iPhone", "Printer", "IoT", "5G", "Lab", "Meeting Room", "DIRECT-", "家"]
+
+
+# ---------- 夹具 ----------
+def escape(field):
+    return field.replace("\\", "\\\\").replace(":", "\\:")
+
+
+def gen_fixture(networks, seed=0):
+    """生成 nmcli -t -f SSID,BSSID,SIGNAL dev wifi list 格式的输出
+
+    大约每 8 个 SSID 有一个企业网（多个 BSSID）；夹杂隐藏网络（空 SSID）、带 ':'、'\\'、空格和中文的 SSID。
+    """
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < networks:
+        kind = rng.random()
+        if kind < 0.05:
+            ssid = ""
+        elif kind < 0.12:
+            ssid = f"{rng.choice(WORDS)}:{rng.randrange(100)}"
+        elif kind < 0.15:
+            ssid = f"{rng.choice(WORDS)}\\{rng.randrange(100)}"
+        else:
+            ssid = f"{rng.choice(WORDS)} {rng.randrange(1000)}".strip()
+        for _ in range(rng.randint(2, 6) if rng.random() < 0.12 else 1):
+            bssid = ":".join(f"{rng.randrange(256):02X}" for _ in range(6))
+            lines.append(f"{escape(ssid)}:{escape(bssid)}:{rng.randint(5, 100)}")
+    return "\n".join(lines[:networks]) + "\n"
+
+
+def load_fixtures(paths):
+    paths = paths or sorted(glob.glob(os.path.join(FIXTURES, "nmcli_wifi_*.txt")))
+    return [(os.path.basename(p), open(p, encoding="utf-8").read()) for p in paths]
+
+
+# ---------- 解析 ----------
+def legacy_parse(raw):
+    """原来的解析：SSID,SIGNAL 两列按 ':' 直接切分，任何一行出错整体返回 {}"""
+    try:
+        return {l.split(":")[0]: int(l.split(":")[1]) for l in raw.splitlines() if ":" in l and l.split(":")[0]}
+    except Exception:
+        return {}
+
+
+def to_two_columns(raw):
+    """把 SSID,BSSID,SIGNAL 夹具转成旧命令 SSID,SIGNAL 的输出"""
+    rows = (wifi_gui.split_terse(l, 3) for l in raw.splitlines())
+    return "\n".join(f"{escape(s)}:{sig}" for s, _, sig in filter(None, rows)) + "\n"
+
+
+def timed(func, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(arg)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def bench_parse(args):
+    parser = wifi_gui.NmcliScanner()
+    print(f"{'夹具':28}{'行数':>6}{'旧解析 ms':>11}{'旧网络数':>9}{'新解析 ms':>11}{'新 BSSID':>10}{'新 SSID':>9}")
+    for name, raw in load_fixtures(args.fixtures):
+        lines = raw.count("\n")
+        old_ms, old = timed(legacy_parse, to_two_columns(raw), args.repeat)
+        new_ms, new = timed(parser.parse, raw, args.repeat)
+        print(f"{name:28}{lines:6d}{old_ms:11.3f}{len(old):9d}{new_ms:11.3f}{len(new):10d}{len({s for s, _, _ in new}):9d}")
+
+
+# ---------- 扫描 ----------
+class SimulatedNmcli:
+    """按录制输出回放的 nmcli：用模拟时钟计费
+
+    和 nmcli 一样，yes 总是做射频扫描，auto（也是不带 --rescan 时的默认）在列表旧于 30 秒时扫描。
+    """
+
+    def __init__(self, raw, list_ms, rescan_ms):
+        self.raw = raw
+        self.list_ms = list_ms
+        self.rescan_ms = rescan_ms
+        self.now = 0.0
+        self.busy = 0.0
+        self.processes = 0
+        self.radio_scans = 0
+        self._last_radio = None
+
+    def run(self, cmd):
+        mode = "auto" if isinstance(cmd, str) else cmd[-1]
+        cost = self.list_ms
+        if mode == "yes" or (mode == "auto" and (self._last_radio is None or self.now - self._last_radio >= 30)):
+            cost += self.rescan_ms
+            self.radio_scans += 1
+            self._last_radio = self.now
+        self.processes += 1
+        self.busy += cost / 1000
+        return self.raw
+
+
+def bench_scan(args):
+    raw = open(args.fixture, encoding="utf-8").read()
+    print(f"{args.fixture}: {raw.count(chr(10))} 行, 刷新 {args.refreshes} 次, 间隔 {args.interval}s, "
+          f"列表 {args.list_ms}ms, 射频扫描 {args.rescan_ms}ms")
+    print(f"{'方式':24}{'进程数':>7}{'射频扫描':>9}{'nmcli 耗时 s':>13}{'解析 CPU ms':>12}{'缓存命中':>9}")
+
+    # 旧方式：每次刷新都跑一次不带 --rescan 的 nmcli（即 auto），并用旧解析
+    sim = SimulatedNmcli(to_two_columns(raw), args.list_ms, args.rescan_ms)
+    cpu = time.process_time()
+    for i in range(args.refreshes):
+        sim.now = i * args.interval
+        legacy_parse(sim.run("nmcli -t -f SSID,SIGNAL dev wifi"))
+    cpu = (time.process_time() - cpu) * 1000
+    print(f"{'旧 scan_wifi':24}{sim.processes:7d}{sim.radio_scans:9d}{sim.busy:13.1f}{cpu:12.1f}{'-':>9}")
+
+    for mode in (args.rescan or ["yes", "auto", "no"]):
+        sim = SimulatedNmcli(raw, args.list_ms, args.rescan_ms)
+        scanner = wifi_gui.NmcliScanner(min_interval=args.min_interval, run=sim.run, clock=lambda: sim.now)
+        cpu = time.process_time()
+        for i in range(args.refreshes):
+            sim.now = i * args.interval
+            scanner.scan(mode)
+        cpu = (time.process_time() - cpu) * 1000
+        label = f"NmcliScanner {mode}"
+        print(f"{label:24}{sim.processes:7d}{sim.radio_scans:9d}{sim.busy:13.1f}{cpu:12.1f}"
+              f"{scanner.stats['cached']:9d}")
+
+
+# ---------- 已保存的配置 ----------
+def gen_profiles_output(profiles, seed=0, separator="\n", uuid_first=True):
+    """生成 nmcli -g connection.uuid,802-11-wireless.ssid connection show <uuid...> 的输出，返回 (输出, 期望结果)"""
+    rng = random.Random(seed)
+    expected, blocks = {}, []
+    for i in range(profiles):
+        uuid = "%08x-0000-4000-8000-%012x" % (rng.randrange(1 << 32), i)
+        ssid = f"{rng.choice(WORDS)}:{i}" if i % 3 == 0 else f"{rng.choice(WORDS)} {i}"
+        expected[ssid] = uuid
+        lines = [uuid, escape(ssid)] if uuid_first else [escape(ssid), uuid]
+        blocks.append("\n".join(lines) + "\n")
+    return separator.join(blocks), expected
+
+
+def check_profiles(args):
+    """SavedProfiles.parse 在各种分隔方式下的正确性和耗时；有不一致时返回 1"""
+    bad = 0
+    cases = [("空行分隔", "\n", True), ("空行分隔, SSID 在前", "\n", False), ("无分隔", "", True),
+             ("多个空行", "\n\n", True)]
+    print(f"{'输出格式':24}{'配置数':>7}{'解析 ms':>9}{'结果':>6}")
+    for label, sep, uuid_first in cases:
+        for n in (1, args.profiles):
+            raw, expected = gen_profiles_output(n, args.seed, sep, uuid_first)
+            ms, got = timed(lambda r: wifi_gui.SavedProfiles.parse(r, expected.values()), raw, args.repeat)
+            ok = got == expected
+            bad += not ok
+            print(f"{label:24}{n:7d}{ms:9.3f}{'通过' if ok else '错误':>6}")
+    return 1 if bad else 0
+
+
+def record(args):
+    """录制本机的 nmcli 输出作为夹具"""
+    raw = subprocess.check_output(["nmcli", "-t", "-f", "SSID,BSSID,SIGNAL", "dev", "wifi", "list"], text=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(raw)
+    print(f"{args.output}: {raw.count(chr(10))} 行")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("gen", help="生成合成夹具")
+    p.add_argument("--networks", type=int, default=500)
+    p.add_argument("--seed", type=int, default=0)
+    p = sub.add_parser("record", help="录制本机 nmcli 输出")
+    p.add_argument("output")
+    p = sub.add_parser("parse", help="解析耗时与正确性")
+    p.add_argument("fixtures", nargs="*", help="默认使用 fixtures/nmcli_wifi_*.txt")
+    p.add_argument("--repeat", type=int, default=20)
+    p = sub.add_parser("scan", help="一段时间内的扫描开销")
+    p.add_argument("--fixture", default=os.path.join(FIXTURES, "nmcli_wifi_500.txt"))
+    p.add_argument("--rescan", action="append", choices=["no", "auto", "yes"])
+    p.add_argument("--refreshes", type=int, default=120)
+    p.add_argument("--interval", type=float, default=5.0, help="刷新间隔（秒）")
+    p.add_argument("--min-interval", type=float, default=wifi_gui.RESCAN_MIN_S)
+    p.add_argument("--list-ms", type=float, default=40.0, help="一次 nmcli 列表的耗时")
+    p.add_argument("--rescan-ms", type=float, default=3000.0, help="一次射频扫描的耗时")
+    p = sub.add_parser("profiles", help="已保存配置 SSID 输出的解析检查")
+    p.add_argument("--profiles", type=int, default=50)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if args.cmd == "gen":
+        sys.stdout.write(gen_fixture(args.networks, args.seed))
+    elif args.cmd == "record":
+        record(args)
+    elif args.cmd == "parse":
+        bench_parse(args)
+    elif args.cmd == "profiles":
+        sys.exit(check_profiles(args))
+    else:
+        bench_scan(args)
+
+
+if __name__ == "__main__":
+    main()
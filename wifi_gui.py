@@ -1,37 +1,262 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-import subprocess, sys, threading, socket, tkinter as tk
+import argparse, os, re, subprocess, sys, threading, socket, struct, time, tkinter as tk
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows
 from tkinter import ttk, messagebox
+from ui_dispatch import UIDispatcher
+from refresh import RefreshScheduler
 
 WIN_SIZE = "240x320"
-REFRESH_MS = 5000          # 5 秒刷新，可改成 10000（10 秒）
+REFRESH_MS = 5000          # 有变化或有操作时 5 秒刷新，可改成 10000（10 秒）
+IDLE_REFRESH_MS = 60000    # 有事件流时只做兜底刷新
+MAX_REFRESH_MS = 300000    # 结果一直不变时逐步退避到 5 分钟
+RESCAN_MIN_S = 30          # 两次真正的射频扫描之间至少间隔（秒），其间用缓存
+CONNECT_TIMEOUT = 30       # 秒
+# nmcli connection up 因密码错误失败时的提示；只有这类失败才改写已保存的密码
+NM_AUTH_ERRORS = ("Secrets were required", "no-secrets", "supplicant")
+# NetworkManager 事件流：链路/连接变化用 nmcli monitor，热点增减和信号变化用 D-Bus 信号
+NM_MONITOR = ["nmcli", "monitor"]
+NM_DBUS_MONITOR = ["gdbus", "monitor", "--system", "--dest", "org.freedesktop.NetworkManager"]
 
 # ---------- 扫描 ----------
-def scan_wifi():
+_TERSE_SEP = re.compile(r"(?<!\\):")
+
+def split_terse(line, fields):
+    """按 nmcli -t 的格式切分一行：字段间用 ':' 分隔，字段内的 ':' 和 '\\' 以 '\\' 转义
+
+    字段数不对时返回 None。
+    """
+    if "\\" not in line:
+        parts = line.split(":", fields - 1)
+    else:
+        # 先把转义的反斜杠换成占位符，剩下前面没有反斜杠的 ':' 才是分隔符
+        parts = [p.replace("\\:", ":").replace("\0", "\\")
+                 for p in _TERSE_SEP.split(line.replace("\\\\", "\0"), fields - 1)]
+    return parts if len(parts) == fields else None
+
+def _check_output(cmd):
+    return subprocess.check_output(cmd, shell=isinstance(cmd, str), text=True, errors="ignore",
+                                   stderr=subprocess.DEVNULL)
+
+class Scanner:
+    """扫描后端基类：子类给出命令和解析；这里负责缓存和限制真正的射频扫描
+
+    scan(rescan) 的 rescan 取 "yes"（强制扫描）、"auto"（由系统决定）、"no"（只读已有结果）：
+    距上次强制扫描不足 min_interval 时 "yes" 降为 "no"；"no" 在缓存不超过 min_interval 且未 invalidate()
+    时直接返回缓存，不起进程。
+    """
+    name = ""
+
+    def __init__(self, min_interval=RESCAN_MIN_S, run=_check_output, clock=time.monotonic):
+        self.min_interval = min_interval
+        self.run = run
+        self.clock = clock
+        self.stats = {"scans": 0, "rescans": 0, "cached": 0}
+        self._cache = None           # 上次的结果 [(SSID, BSSID, 信号)]
+        self._cache_time = 0.0
+        self._last_rescan = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """系统报告扫描结果有变化时调用，下次 "no" 也会重新读取"""
+        self._cache = None
+
+    def scan(self, rescan="auto"):
+        """返回 [(SSID, BSSID, 信号)]；拿不到 BSSID 的后端 BSSID 为空串"""
+        with self._lock:
+            now = self.clock()
+            if rescan == "yes" and self._last_rescan is not None and now - self._last_rescan < self.min_interval:
+                rescan = "no"
+            if rescan == "no" and self._cache is not None and now - self._cache_time < self.min_interval:
+                self.stats["cached"] += 1
+                return self._cache
+            try:
+                raw = self.run(self.command(rescan))
+            except Exception:
+                return self._cache or []
+            self.stats["scans"] += 1
+            if rescan == "yes":
+                self.stats["rescans"] += 1
+                self._last_rescan = now
+            self._cache, self._cache_time = self.parse(raw), now
+            return self._cache
+
+    def command(self, rescan):
+        raise NotImplementedError
+
+    def parse(self, raw):
+        raise NotImplementedError
+
+class NmcliScanner(Scanner):
+    name = "nmcli"
+
+    def command(self, rescan):
+        return ["nmcli", "-t", "-f", "SSID,BSSID,SIGNAL", "dev", "wifi", "list", "--rescan", rescan]
+
+    def parse(self, raw):
+        rows = (split_terse(line, 3) for line in raw.splitlines())
+        return [(ssid, bssid, int(sig)) for ssid, bssid, sig in filter(None, rows) if ssid and sig.isdigit()]
+
+class NetshScanner(Scanner):
+    """Windows：只能列出已保存的配置，没有信号和 BSSID"""
+    name = "netsh"
+
+    def command(self, rescan):
+        return "netsh wlan show profiles"
+
+    def parse(self, raw):
+        return [(line.split(":", 1)[1].strip(), "", 80)
+                for line in raw.splitlines() if "所有用户配置文件" in line]
+
+class AirportScanner(Scanner):
+    name = "airport"
+    _ROW = re.compile(r"\s*(.*?)\s+((?:[0-9a-f]{2}:){5}[0-9a-f]{2})\s+(-?\d+)")
+
+    def command(self, rescan):
+        return ["/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport", "-s"]
+
+    def parse(self, raw):
+        rows = (self._ROW.match(line) for line in raw.splitlines()[1:])
+        return [(m[1], m[2], max(0, min(100, (int(m[3]) + 100) * 2))) for m in rows if m]
+
+SCANNERS = {cls.name: cls for cls in (NmcliScanner, NetshScanner, AirportScanner)}
+
+def default_scanner(**kwargs):
+    """按平台选扫描后端"""
+    if sys.platform.startswith("win"):
+        return NetshScanner(**kwargs)
+    if sys.platform == "darwin":
+        return AirportScanner(**kwargs)
+    return NmcliScanner(**kwargs)
+
+_scanner = None
+
+def scan_networks(rescan="auto"):
+    """用平台默认后端扫描，返回 [(SSID, BSSID, 信号)]"""
+    global _scanner
+    if _scanner is None:
+        _scanner = default_scanner()
+    return _scanner.scan(rescan)
+
+def scan_wifi(rescan="auto"):
+    """返回 dict：SSID -> 信号（同名多个 BSSID 取最强）"""
+    result = {}
+    for ssid, _, sig in scan_networks(rescan):
+        result[ssid] = max(sig, result.get(ssid, sig))
+    return result
+
+# ---------- 获取已连接 SSID 与 IP ----------
+SIOCGIFADDR = 0x8915
+
+def wireless_interfaces():
+    """Linux：返回无线网卡名列表，已启用的在前"""
+    names = [n for n in os.listdir("/sys/class/net") if os.path.isdir(f"/sys/class/net/{n}/wireless")]
+
+    def is_up(name):
+        try:
+            with open(f"/sys/class/net/{name}/operstate") as f:
+                return f.read().strip() == "up"
+        except OSError:
+            return False
+
+    return sorted(names, key=lambda n: not is_up(n))
+
+def interface_ipv4(ifname):
+    """用 SIOCGIFADDR 读网卡的 IPv4 地址，不建立连接也不起进程；没有地址时返回空串"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            res = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack("256s", ifname[:15].encode()))
+        except OSError:
+            return ""
+    return socket.inet_ntoa(res[20:24])
+
+def route_ipv4():
+    """取不到网卡信息的平台：查默认路由的源地址（UDP connect 不发包）"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect(("8.8.8.8", 80))
+        return s.getsockname()[0]
+
+def current_ssid(ifname=""):
+    """返回当前连接的 SSID，未连接时为空串"""
     system = sys.platform
-    try:
-        if system.startswith("win"):
-            raw = subprocess.check_output("netsh wlan show profiles",
-                                          shell=True, text=True, errors="ignore")
-            ssids = [line.split(":", 1)[1].strip()
-                     for line in raw.splitlines() if "所有用户配置文件" in line]
-            return {s: 80 for s in ssids}          # 返回 dict：SSID -> 信号
-        elif system.startswith("linux"):
-            raw = subprocess.check_output("nmcli -t -f SSID,SIGNAL dev wifi",
-                                          shell=True, text=True, errors="ignore")
-            return {l.split(":")[0]: int(l.split(":")[1])
-                    for l in raw.splitlines() if ":" in l and l.split(":")[0]}
-        elif system == "darwin":
-            raw = subprocess.check_output(
-                "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport -s",
-                shell=True, text=True, errors="ignore")
-            return {parts[0]: max(0, min(100, (int(parts[1]) + 100) * 2))
-                    for parts in [l.split() for l in raw.splitlines()[1:]] if parts}
-    except Exception:
-        return {}
+    if system.startswith("win"):
+        raw = _check_output("netsh wlan show interfaces")
+        for line in raw.splitlines():
+            if "SSID" in line and "BSSID" not in line:
+                return line.split(":", 1)[1].strip()
+    elif system.startswith("linux"):
+        cmd = ["nmcli", "-t", "-f", "ACTIVE,SSID", "dev", "wifi", "list", "--rescan", "no"]
+        raw = _check_output(cmd + (["ifname", ifname] if ifname else []))
+        for row in filter(None, (split_terse(line, 2) for line in raw.splitlines())):
+            if row[0] == "yes":
+                return row[1]
+    elif system == "darwin":
+        raw = _check_output(
+            "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport -I")
+        for line in raw.splitlines():
+            if " SSID" in line:
+                return line.split(":", 1)[1].strip()
+    return ""
+
+class LinkStatus:
+    """已连接 SSID 与 IP 的提供者，其它界面也可直接使用：LinkStatus().get() -> (ssid, ip)
+
+    按无线网卡查询：网卡、SSID 和 IP 都缓存到 invalidate()（链路变化时调用）为止；IP 用 ioctl 直接读，
+    还没拿到地址（如 DHCP 未完成）时每次重读。SSID 和 IP 分开查询，一个失败不影响另一个。
+    """
+
+    def __init__(self):
+        self._iface = None
+        self._ssid = None
+        self._ip = ""
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        with self._lock:
+            self._iface = self._ssid = None
+            self._ip = ""
+
+    def interface(self):
+        """当前无线网卡名；不是 Linux 或没有无线网卡时为空串"""
+        if self._iface is None:
+            try:
+                self._iface = (wireless_interfaces() or [""])[0] if sys.platform.startswith("linux") else ""
+            except OSError:
+                self._iface = ""
+        return self._iface
+
+    def get(self):
+        with self._lock:
+            iface = self.interface()
+            if self._ssid is None:
+                try:
+                    self._ssid = current_ssid(iface)
+                except Exception:
+                    self._ssid = ""
+            if not self._ip:
+                try:
+                    self._ip = interface_ipv4(iface) if iface and fcntl else route_ipv4()
+                except Exception:
+                    self._ip = ""
+            return self._ssid, self._ip
+
+_link_status = LinkStatus()
+
+def get_connected_info():
+    """返回 (SSID, IP)，未连接的一项为空串
+
+    每次都重新查询：这里没有订阅链路事件，无从知道缓存何时过期。想要缓存的界面自己持有
+    LinkStatus，并在链路事件时调用 invalidate()。
+    """
+    _link_status.invalidate()
+    return _link_status.get()
 
 # ---------- 连接 ----------
-def connect_wifi(ssid, pwd):
+def _connect_other(ssid, pwd):
+    """Windows / macOS：写入配置并连接"""
     try:
         if sys.platform.startswith("win"):
             profile = f'''<?xml version="1.0"?>
@@ -54,52 +279,197 @@ def connect_wifi(ssid, pwd):
                 f.write(profile)
             subprocess.check_call('netsh wlan add profile filename="temp_profile.xml"', shell=True)
             subprocess.check_call(f'netsh wlan connect name="{ssid}"', shell=True)
-        elif sys.platform.startswith("linux"):
-            subprocess.check_call(f'nmcli dev wifi connect "{ssid}" password "{pwd}"', shell=True)
         elif sys.platform == "darwin":
             subprocess.check_call(f'networksetup -setairportnetwork en0 "{ssid}" "{pwd}"', shell=True)
         return True
     except Exception:
         return False
 
-# ---------- 获取已连接 SSID 与 IP ----------
-def get_connected_info():
-    system = sys.platform
-    ssid = ip = ""
-    try:
-        if system.startswith("win"):
-            raw = subprocess.check_output("netsh wlan show interfaces",
-                                          shell=True, text=True, errors="ignore")
-            for line in raw.splitlines():
-                if "SSID" in line and "BSSID" not in line:
-                    ssid = line.split(":", 1)[1].strip()
-        elif system.startswith("linux"):
-            raw = subprocess.check_output("nmcli -t -f NAME,DEVICE connection show --active",
-                                          shell=True, text=True, errors="ignore")
-            for line in raw.splitlines():
-                if ":" in line:
-                    ssid = line.split(":")[0]
-                    break
-        elif system == "darwin":
-            raw = subprocess.check_output(
-                "/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport -I",
-                shell=True, text=True, errors="ignore")
-            for line in raw.splitlines():
-                if " SSID" in line:
-                    ssid = line.split(":", 1)[1].strip()
-        # 获取本机 IPv4
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.settimeout(0.1)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-    except Exception:
-        pass
-    return ssid, ip
+class SavedProfiles:
+    """NetworkManager 里已保存的 Wi-Fi 配置：SSID -> UUID，缓存到 invalidate()（配置增删改时调用）
+
+    不论保存了多少个配置，读取都只用两次 nmcli：列出配置，再一次取出所有 Wi-Fi 配置的 SSID。
+    """
+
+    def __init__(self, run=_check_output):
+        self.run = run
+        self._profiles = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._profiles = None
+
+    def get(self):
+        with self._lock:
+            if self._profiles is None:
+                try:
+                    self._profiles = self._load() if sys.platform.startswith("linux") else {}
+                except Exception:
+                    return {}
+            return self._profiles
+
+    def _load(self):
+        raw = self.run(["nmcli", "-t", "-f", "UUID,TYPE", "connection", "show"])
+        uuids = [row[0] for row in filter(None, (split_terse(line, 2) for line in raw.splitlines()))
+                 if row[1] == "802-11-wireless"]
+        if not uuids:
+            return {}
+        raw = self.run(["nmcli", "-g", "connection.uuid,802-11-wireless.ssid", "connection", "show", *uuids])
+        return self.parse(raw, uuids)
+
+    @staticmethod
+    def parse(raw, uuids):
+        """解析 nmcli -g connection.uuid,802-11-wireless.ssid connection show <uuid...> 的输出 -> {ssid: uuid}
+
+        每个配置输出 UUID 和 SSID 两行（先后不作假设），多个配置之间 nmcli 会空一行；
+        没有空行分隔时按两行一组切分。认不出 UUID 的组跳过，不会把空串当成 SSID 或 UUID。
+        """
+        uuids = set(uuids)
+        blocks, block = [], []
+        for line in raw.splitlines() + [""]:
+            if line.strip():
+                block.append(split_terse(line, 1)[0])
+            elif block:
+                blocks.append(block)
+                block = []
+        profiles = {}
+        for block in blocks:
+            for first, second in zip(block[::2], block[1::2]):
+                if first in uuids:
+                    uuid, ssid = first, second
+                elif second in uuids:
+                    uuid, ssid = second, first
+                else:
+                    continue
+                if ssid:
+                    profiles.setdefault(ssid, uuid)
+        return profiles
+
+class WifiConnector:
+    """连接 Wi-Fi：已保存的网络直接 `nmcli connection up`，只有没保存过的才走密码建配置
+
+    返回 (是否成功, 提示, [(阶段, 秒)])；Linux 上跟踪网卡状态把耗时拆成关联和 DHCP 两段。
+    """
+
+    def __init__(self, profiles=None, link=None, timeout=CONNECT_TIMEOUT):
+        self.profiles = profiles or SavedProfiles()
+        self.link = link or LinkStatus()
+        self.timeout = timeout
+
+    def connect(self, ssid, pwd=""):
+        """pwd 只应是用户这次为 ssid 输入的密码；已保存的网络只有因认证失败连不上时才用它改写保存的密码"""
+        if not sys.platform.startswith("linux"):
+            start = time.monotonic()
+            ok = _connect_other(ssid, pwd)
+            return ok, "连接成功" if ok else "连接失败", [("连接", time.monotonic() - start)]
+        uuid = self.profiles.get().get(ssid)
+        if uuid:
+            ok, out, phases = self._run(["connection", "up", uuid])
+            if not ok and pwd and any(err in out for err in NM_AUTH_ERRORS):
+                # 保存的密码已失效：改掉原配置的密码再试，不新建重复的配置；不在范围内、超时等失败不动密码
+                self._nmcli(["connection", "modify", uuid, "wifi-sec.psk", pwd])
+                ok, out, phases = self._run(["connection", "up", uuid])
+        else:
+            ok, out, phases = self._run(["dev", "wifi", "connect", ssid] + (["password", pwd] if pwd else []))
+            self.profiles.invalidate()
+        self.link.invalidate()
+        return ok, "连接成功" if ok else (out or "连接失败"), phases
+
+    def _nmcli(self, args):
+        try:
+            ret = subprocess.run(["nmcli", "--wait", str(self.timeout), *args], stdout=subprocess.PIPE,
+                                 stderr=subprocess.STDOUT, text=True, timeout=self.timeout + 5)
+            return ret.returncode == 0, ret.stdout.strip()
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return False, str(e)
+
+    def _run(self, args):
+        # 用 nmcli device monitor 记下进入“获取 IP 配置”和“已连接”的时刻
+        marks, monitor = {}, None
+        iface = self.link.interface()
+        if iface:
+            try:
+                monitor = subprocess.Popen(["nmcli", "device", "monitor", iface], stdout=subprocess.PIPE,
+                                           stderr=subprocess.DEVNULL, text=True, errors="ignore")
+                threading.Thread(target=self._watch, args=(monitor, marks), daemon=True).start()
+            except OSError:
+                pass
+        start = time.monotonic()
+        ok, out = self._nmcli(args)
+        end = time.monotonic()
+        if monitor is not None:
+            monitor.terminate()
+        if ok and "ip" in marks:
+            phases = [("关联", marks["ip"] - start), ("DHCP", marks.get("connected", end) - marks["ip"])]
+        else:
+            phases = [("连接", end - start)]
+        return ok, out, phases
+
+    @staticmethod
+    def _watch(proc, marks):
+        for line in proc.stdout:
+            if "getting IP configuration" in line:
+                marks.setdefault("ip", time.monotonic())
+            elif line.rstrip().endswith(": connected"):
+                marks.setdefault("connected", time.monotonic())
+
+_connector = None
+
+def connect_wifi(ssid, pwd=""):
+    """连接成功返回 True；已保存的网络可不给密码"""
+    global _connector
+    if _connector is None:
+        _connector = WifiConnector(link=_link_status)
+    return _connector.connect(ssid, pwd)[0]
+
+# ---------- 事件流 ----------
+class EventStream:
+    """常驻一个监视进程，逐行分类后回调 on_event(kind)
+
+    进程起不来或中途退出时 running 为 False，调用方据此退回定时轮询。
+    """
+
+    def __init__(self, cmd, classify, on_event):
+        self.cmd = cmd
+        self.classify = classify
+        self.on_event = on_event
+        self.proc = None
+        self.running = False
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self):
+        try:
+            self.proc = subprocess.Popen(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                         text=True, errors="ignore")
+        except OSError:
+            return
+        self.running = True
+        for line in self.proc.stdout:
+            kind = self.classify(line)
+            if kind:
+                self.on_event(kind)
+        self.running = False
+
+    def close(self):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+
+def classify_monitor(line):
+    """nmcli monitor 的一行 -> "profiles"（连接配置增删改）/ "link"（其余的设备和连接状态变化）"""
+    return "profiles" if "connection profile" in line else "link"
+
+def classify_dbus(line):
+    """gdbus monitor 的一行 -> "scan"（热点增减、信号、扫描完成）/ "link"（设备或连接状态）/ None"""
+    if "AccessPoint" in line or "LastScan" in line:
+        return "scan"
+    if "StateChanged" in line or "ActiveConnection" in line or "PrimaryConnection" in line:
+        return "link"
+    return None
 
 # ---------- GUI ----------
 class WifiGUI(tk.Tk):
-    def __init__(self):
+    def __init__(self, scanner=None, rescan="auto"):
+        """scanner 为扫描后端（默认按平台选择）；rescan 为定时刷新时的扫描方式 yes/auto/no"""
         super().__init__()
         self.title("Wi-Fi")
         self.geometry(WIN_SIZE)
@@ -118,6 +488,8 @@ class WifiGUI(tk.Tk):
         self.tree.configure(yscrollcommand=scroll.set)
         self.tree.pack(side="left", fill="both", expand=True)
         scroll.pack(side="right", fill="y")
+        self.tree.tag_configure("saved", foreground="#0066cc")  # 已保存的网络，无需密码
+        self.tree.bind("<ButtonRelease-1>", self.on_tap)  # 点一下已保存的网络直接连接
 
         # 底部
         bottom = tk.Frame(self, bg="#ffffff")
@@ -133,80 +505,193 @@ class WifiGUI(tk.Tk):
         self.conn_lbl = tk.Label(self, text="", font=("Helvetica", 9), bg="#ffffff")
         self.conn_lbl.pack(pady=1)
 
-        # 定时器
-        self.after(200, self.refresh_list)
-        self.after(REFRESH_MS, self.periodic_refresh)
-        self.after(REFRESH_MS, self.update_connected)
+        # 扫描和查询都在工作线程里做，结果经队列回到主线程更新界面
+        self.ui = UIDispatcher(self)
+        self.ui.register("scan", self._show_scan)
+        self.ui.register("connected", self._show_connected)
+        self.ui.register("event-scan", lambda _: self.refresh.trigger("scan", "no", True))
+        self.ui.register("event-link", lambda _: (self.link.invalidate(), self.refresh.trigger("link")))
+        self.ui.register("event-profiles", lambda _: (self.profiles.invalidate(), self.load_profiles()))
+        self.ui.register("profiles", self._show_profiles)
+        self.scanner = scanner or default_scanner()
+        self.link = LinkStatus()
+        self.profiles = SavedProfiles()
+        self.connector = WifiConnector(self.profiles, self.link)
+        self._saved = frozenset()    # 已保存配置的 SSID
+        self._current = None         # 当前连接的 SSID
+        self._connecting = False
+        self.rescan = rescan
+        self._index = {}             # SSID -> {"iid", "sig", "tags", "children": {BSSID: [iid, 信号]}}，与列表同步
+        self._ssid_of = {}           # iid -> SSID（父行和子行）
+
+        # Linux 上订阅 NetworkManager 的事件，变化即刷新；订阅不到时按 REFRESH_MS 轮询
+        self.streams = {}
+        if sys.platform.startswith("linux"):
+            self.streams["scan"] = EventStream(NM_DBUS_MONITOR, classify_dbus, self._on_event)
+            self.streams["link"] = EventStream(NM_MONITOR, classify_monitor, self._on_event)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # 定时器：同一来源同时只跑一次；结果不变时逐步放慢，有变化或有操作时回到 _interval()
+        self.load_profiles()
+        self.refresh = RefreshScheduler(self)
+        self.refresh.add("scan", self._start_scan, lambda: self._interval("scan"), MAX_REFRESH_MS, delay_ms=200)
+        self.refresh.add("link", self._start_link, lambda: self._interval("link"), MAX_REFRESH_MS,
+                         delay_ms=REFRESH_MS)
+        self.refresh.watch_input(self)
+
+    def _on_event(self, kind):
+        # 事件流的读线程里调用；同一周期内的多个事件由 UIDispatcher 合并成一次
+        self.ui.post(f"event-{kind}", None)
+
+    def _interval(self, kind):
+        stream = self.streams.get(kind)
+        return IDLE_REFRESH_MS if stream and stream.running else REFRESH_MS
+
+    def on_close(self):
+        self.refresh.stop()
+        for stream in self.streams.values():
+            stream.close()
+        self.destroy()
 
     # ---------- 增量刷新 ----------
-    def refresh_list(self):
+    def refresh_list(self, rescan=None):
+        self.refresh.trigger("scan", rescan)
+
+    def _start_scan(self, rescan=None, invalidate=False):
+        if invalidate:
+            self.scanner.invalidate()  # 事件之后的扫描不能用事件之前的缓存
         self.status.config(text="扫描中...", fg="blue")
-        threading.Thread(target=self._scan, daemon=True).start()
+        threading.Thread(target=self._scan, args=(rescan or self.rescan,), daemon=True).start()
+
+    def _scan(self, rescan):
+        # 工作线程：只扫描，不碰界面
+        self.ui.post("scan", tuple(self.scanner.scan(rescan)))
 
-    def _scan(self):
-        new_data = scan_wifi()          # dict: SSID -> 信号
-        old_sel = self.tree.item(self.tree.selection(), "text") if self.tree.selection() else None
+    def _show_scan(self, networks):
+        groups = {}                     # SSID -> {BSSID: 信号}
+        for ssid, bssid, sig in networks:
+            groups.setdefault(ssid, {})[bssid] = sig
+        # 只看网络的增减，信号的抖动不算变化
+        self.refresh.done("scan", frozenset(groups))
 
-        # 1. 更新或新增
-        for ssid, sig in new_data.items():
-            item = self._find_item(ssid)
-            if item:
-                self.tree.item(item, values=(f"{sig}%",))
-            else:
-                self.tree.insert("", "end", text=ssid, values=(f"{sig}%",))
+        # 1. 删除已消失的网络（子行随父行一起删除）
+        gone = [ssid for ssid in self._index if ssid not in groups]
+        for ssid in gone:
+            node = self._index.pop(ssid)
+            self.tree.delete(node["iid"])
+            for iid, _ in node["children"].values():
+                del self._ssid_of[iid]
+            del self._ssid_of[node["iid"]]
 
-        # 2. 删除已消失的
-        for item in self.tree.get_children():
-            if self.tree.item(item, "text") not in new_data:
-                self.tree.delete(item)
+        # 2. 更新或新增：父行显示最强信号，展开后是每个 BSSID
+        for ssid, bssids in groups.items():
+            best = max(bssids.values())
+            node = self._index.get(ssid)
+            if node is None:
+                tags = ("saved",) if ssid in self._saved else ()
+                iid = self.tree.insert("", "end", text=ssid, values=(f"{best}%",), tags=tags)
+                node = self._index[ssid] = {"iid": iid, "sig": best, "tags": tags, "children": {}}
+                self._ssid_of[iid] = ssid
+            elif node["sig"] != best:
+                self.tree.item(node["iid"], values=(f"{best}%",))
+                node["sig"] = best
+            children = node["children"]  # BSSID -> [iid, 信号]
+            for bssid in [b for b in children if b not in bssids]:
+                iid, _ = children.pop(bssid)
+                self.tree.delete(iid)
+                del self._ssid_of[iid]
+            for bssid, sig in bssids.items():
+                if not bssid:
+                    continue
+                child = children.get(bssid)
+                if child is None:
+                    iid = self.tree.insert(node["iid"], "end", text=bssid, values=(f"{sig}%",))
+                    children[bssid] = [iid, sig]
+                    self._ssid_of[iid] = ssid
+                elif child[1] != sig:
+                    self.tree.item(child[0], values=(f"{sig}%",))
+                    child[1] = sig
 
-        # 3. 恢复选中
-        if old_sel and old_sel in new_data:
-            item = self._find_item(old_sel)
-            if item:
-                self.tree.selection_set(item)
+        self.status.config(text=f"{len(groups)} 个网络")
 
-        self.status.config(text=f"{len(new_data)} 个网络")
+    def load_profiles(self):
+        threading.Thread(target=lambda: self.ui.post("profiles", frozenset(self.profiles.get())),
+                         daemon=True).start()
+
+    def _show_profiles(self, saved):
+        self._saved = saved
+        for ssid, node in self._index.items():
+            tags = ("saved",) if ssid in saved else ()
+            if node["tags"] != tags:
+                self.tree.item(node["iid"], tags=tags)
+                node["tags"] = tags
 
     def _find_item(self, ssid):
-        for item in self.tree.get_children():
-            if self.tree.item(item, "text") == ssid:
-                return item
-        return None
+        node = self._index.get(ssid)
+        return node["iid"] if node else None
 
     # ---------- 连接 ----------
+    def on_tap(self, event):
+        iid = self.tree.identify_row(event.y)
+        if not iid or self.tree.identify_element(event.x, event.y).endswith("indicator"):
+            return  # 空白处或展开箭头
+        ssid = self._ssid_of.get(iid)
+        if ssid in self._saved and ssid != self._current:
+            self._start_connect(ssid, "")  # 只用保存的密码，不带密码框里可能是给别的网络输入的内容
+
     def on_connect(self):
         item = self.tree.selection()
         if not item:
             messagebox.showwarning("提示", "请选择 Wi-Fi")
             return
-        ssid = self.tree.item(item, "text")
+        ssid = self._ssid_of[item[0]]  # 选中 BSSID 子行时取其所属的网络
         pwd = self.pwd.get()
-        if not pwd:
+        if not pwd and ssid not in self._saved:
             messagebox.showwarning("提示", "请输入密码")
             return
+        self._start_connect(ssid, pwd)
+
+    def _start_connect(self, ssid, pwd):
+        if self._connecting:
+            return
+        self._connecting = True
         self.status.config(text="连接中...", fg="blue")
         threading.Thread(target=self._connect, args=(ssid, pwd), daemon=True).start()
 
     def _connect(self, ssid, pwd):
-        ok = connect_wifi(ssid, pwd)
-        self.status.config(text="连接成功" if ok else "连接失败", fg="green" if ok else "red")
-        self.after(500, self.update_connected)
+        ok, msg, phases = self.connector.connect(ssid, pwd)
+        timing = " ".join(f"{name} {dt:.1f}s" for name, dt in phases)
+        print(f"连接 {ssid}: {msg} ({timing})")
+        self.ui.call(self._connect_done, ok, timing)
+
+    def _connect_done(self, ok, timing):
+        self._connecting = False
+        self.status.config(text=f"{'连接成功' if ok else '连接失败'} {timing}", fg="green" if ok else "red")
+        self.load_profiles()
+        self.after(500, lambda: self.refresh.trigger("link"))
 
     # ---------- 定时 ----------
-    def periodic_refresh(self):
-        self.refresh_list()
-        self.after(REFRESH_MS, self.periodic_refresh)
+    def _start_link(self):
+        if not (self.streams.get("link") and self.streams["link"].running):
+            self.link.invalidate()  # 收不到链路事件时只能每次重新查询
+        threading.Thread(target=lambda: self.ui.post("connected", self.link.get()), daemon=True).start()
 
-    def update_connected(self):
-        ssid, ip = get_connected_info()
+    def _show_connected(self, info):
+        self.refresh.done("link", info)
+        ssid, ip = info
+        self._current = ssid
         if ssid:
             self.conn_lbl.config(text=f"已连接: {ssid}\nIP: {ip}", fg="green")
         else:
             self.conn_lbl.config(text="未连接", fg="gray")
-        self.after(REFRESH_MS, self.update_connected)
 
 
 if __name__ == "__main__":
-    WifiGUI().mainloop()
+    parser = argparse.ArgumentParser(description="Wi-Fi 连接器")
+    parser.add_argument("--backend", choices=list(SCANNERS), help="扫描后端，默认按平台选择")
+    parser.add_argument("--rescan", choices=["no", "auto", "yes"], default="auto", help="定时刷新时的扫描方式")
+    parser.add_argument("--rescan-interval", type=float, default=RESCAN_MIN_S, help="两次射频扫描的最短间隔（秒）")
+    args = parser.parse_args()
+    scanner = (SCANNERS[args.backend] if args.backend else default_scanner)(min_interval=args.rescan_interval)
+    WifiGUI(scanner, args.rescan).mainloop()
     
\ No newline at end of file
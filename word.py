@@ -1,41 +1,66 @@
-import time
+import os, queue, sys, threading
 from unihiker import GUI
+from word_bank import WordBank
+
+FEEDBACK_S = 1  # 显示 ✔/✖ 的时间（秒），期间按 B 可直接跳到下一题
+# 词库文件（.jsonl 或 .csv），可在命令行给出；不存在时使用下面内置的词表
+WORD_BANK = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), "words.jsonl")
+
+# 控件只在 build_gui 里创建一次，之后每题只改文字和边框，不清屏重画
+def build_gui():
+    global label_word, labels_list, boxes_list, mark
+    label_word = u_gui.draw_text(text="", x=80, y=70, font_size=30, color="#330099")
+    labels_list = [u_gui.draw_text(text="", x=15, y=y, font_size=13, color="#000000") for y in (193, 238, 283)]
+    boxes_list = [u_gui.draw_round_rect(x=5, y=y, w=230, h=30, r=5, width=1, color="#000000")
+                  for y in (190, 235, 280)]
+    mark = u_gui.draw_text(text="", x=210, y=186, font_size=20, color="#0000FF")  # ✔/✖，不显示时文字为空
+
 
 def show_gui(word_idx):
-    global words_list, boxes_list, tested_word
-    u_gui.clear()
+    global tested_word
     tested_word = (words_list[word_idx])
-    label_word = u_gui.draw_text(text=(tested_word["单词"]), x=80, y=70, font_size=30, color="#330099")
-    answers_list = tested_word["选项"]
-    label_word1 = u_gui.draw_text(text=(answers_list[0]), x=15, y=193, font_size=13, color="#000000")
-    label_word2 = u_gui.draw_text(text=(answers_list[1]), x=15, y=238, font_size=13, color="#000000")
-    label_word3 = u_gui.draw_text(text=(answers_list[2]), x=15, y=283, font_size=13, color="#000000")
-    box1=u_gui.draw_round_rect(x=5, y=190, w=230, h=30, r=5, width=3, color="#000000")
-    box2=u_gui.draw_round_rect(x=5, y=235, w=230, h=30, r=5, width=1, color="#000000")
-    box3=u_gui.draw_round_rect(x=5, y=280, w=230, h=30, r=5, width=1, color="#000000")
-    boxes_list = [box1, box2, box3]
+    label_word.config(text=tested_word["单词"])
+    for label, text in zip(labels_list, tested_word["选项"]):
+        label.config(text=text)
+    mark.config(text="")
+    select(1)
+
+
+def select(idx):
+    global answer
+    boxes_list[answer-1].config(width=1)
+    boxes_list[idx-1].config(width=3)
+    answer = idx
 
 
+def show_mark(right):
+    y_list = [186, 231, 276]
+    if right:
+        mark.config(text="✔", y=y_list[answer-1], color="#0000FF")
+    else:
+        mark.config(text="✖", y=y_list[answer-1], color="#FF6600")
+
+
+# 按键回调在 GUI 线程里执行，只把事件放进队列，由主循环处理
 def on_a_click_callback():
-    global  button_a
-    button_a = True
+    events.put("a")
 
 
 def on_b_click_callback():
-    global button_b
-    button_b = True
+    events.put("b")
 
 
+events = queue.Queue()
 u_gui=GUI()
 u_gui.on_key_click("a", on_a_click_callback)
 u_gui.on_key_click("b", on_b_click_callback)
 
-button_a, button_b = False, False
+state = "answer"  # answer：选择答案；feedback：显示对错，等定时器或按 B 进入下一题
+feedback_timer = None
 
 answer = 1
 tested_word_idx = 0
 tested_word = {}
-boxes_list = []
 
 words_list = [
     {
@@ -49,27 +74,29 @@ words_list = [
         "正确答案": 2
     }
 ]
+if os.path.exists(WORD_BANK):
+    words_list = WordBank(WORD_BANK)  # 按题号从索引里逐条读取，不整本载入
 
+build_gui()
 show_gui(tested_word_idx)
 
 while True:
-    if button_a:
-        button_a = False
-        answer += 1
-        if answer > 3: answer = 1
-        boxes_list[answer-2].config(width=1)
-        boxes_list[answer-1].config(width=3)
-
-    if button_b:
-        button_b = False
-        y_list = [186, 231, 276]
-        if answer == tested_word["正确答案"]:
-            wrong_or_right = u_gui.draw_text(text="✔", x=210, y=y_list[answer-1], font_size=20, color="#0000FF")
-        else:
-            wrong_or_right = u_gui.draw_text(text="✖", x=210, y=y_list[answer-1], font_size=20, color="#FF6600")
-        time.sleep(1)
+    event = events.get()  # 没有事件时阻塞，不占 CPU
+
+    if state == "answer" and event == "a":
+        select(answer % 3 + 1)
+
+    elif state == "answer" and event == "b":
+        show_mark(answer == tested_word["正确答案"])
+        state = "feedback"
+        feedback_timer = threading.Timer(FEEDBACK_S, events.put, args=("next",))
+        feedback_timer.daemon = True
+        feedback_timer.start()
+
+    elif state == "feedback" and event in ("next", "b"):
+        feedback_timer.cancel()  # 按 B 跳过时定时器还没到
+        state = "answer"
         tested_word_idx += 1
-        answer = 1
 
         if tested_word_idx == len(words_list):
             break
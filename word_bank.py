@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""word.py 的词库：从 JSON Lines 或 CSV 文件读取，导入一次 SQLite 索引后按题号逐条读取
+
+JSON Lines 每行一个词，和 word.py 内置词表的格式相同：
+    {"单词": "lose", "选项": ["v.许诺，保证", "n.小路；小径", "v.丧失；失去"], "正确答案": 3}
+CSV 第一行为表头：
+    单词,选项1,选项2,选项3,正确答案
+
+索引文件默认放在词库旁边（词库名 + ".db"），词库的大小或修改时间变了会自动重建。
+打开词库只读索引里的词数，启动时间和内存不随词库大小增长。
+"""
+import csv, json, os, sqlite3
+
+OPTIONS = 3  # 每题的选项数，和界面上的三个选项框对应
+CACHE_KB = 256  # SQLite 页缓存上限；逐题读取用不到更多
+
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8-sig") as f:
+        for lineno, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    item = json.loads(line)
+                    yield lineno, item["单词"], item["选项"], item["正确答案"]
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{path}:{lineno}: {e}") from None
+
+
+def _read_csv(path):
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                yield (reader.line_num, row["单词"], [row[f"选项{i}"] for i in range(1, OPTIONS + 1)],
+                       row["正确答案"])
+            except KeyError as e:
+                raise ValueError(f"{path}:{reader.line_num}: 缺少列 {e}") from None
+
+
+def _rows(path):
+    read = _read_csv if path.lower().endswith(".csv") else _read_jsonl
+    for lineno, word, options, answer in read(path):
+        try:
+            answer = int(answer)
+        except (TypeError, ValueError):
+            answer = 0
+        if not isinstance(options, list) or len(options) != OPTIONS or not 1 <= answer <= OPTIONS:
+            raise ValueError(f"{path}:{lineno}: 需要 {OPTIONS} 个选项和 1~{OPTIONS} 的正确答案")
+        yield word, json.dumps(options, ensure_ascii=False), answer
+
+
+class WordBank:
+    """按题号读取的词库：len(bank) 为词数，bank[i] 返回和内置词表相同格式的 dict"""
+
+    def __init__(self, path, index=None):
+        self.path = path
+        self.index = index or path + ".db"
+        st = os.stat(path)
+        self._source = f"{st.st_size}:{st.st_mtime_ns}"
+        self.db = self._open()
+        self.db.execute(f"PRAGMA cache_size = -{CACHE_KB}")
+        self._len = self.db.execute("SELECT COUNT(*) FROM words").fetchone()[0]
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self._len
+        row = self.db.execute("SELECT word, options, answer FROM words WHERE id = ?", (idx,)).fetchone()
+        if row is None:
+            raise IndexError(idx)
+        word, options, answer = row
+        return {"单词": word, "选项": json.loads(options), "正确答案": answer}
+
+    def close(self):
+        self.db.close()
+
+    def _open(self):
+        if os.path.exists(self.index):
+            db = sqlite3.connect(self.index)
+            try:
+                if db.execute("SELECT value FROM meta WHERE key = 'source'").fetchone() == (self._source,):
+                    return db
+            except sqlite3.Error:
+                pass  # 索引损坏
+            db.close()
+        self._build()
+        return sqlite3.connect(self.index)
+
+    def _build(self):
+        # 先写临时文件再替换，中途出错不会留下半个索引
+        tmp = self.index + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        db = sqlite3.connect(tmp)
+        try:
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            db.execute("CREATE TABLE words (id INTEGER PRIMARY KEY, word TEXT, options TEXT, answer INTEGER)")
+            db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            db.executemany("INSERT INTO words VALUES (?, ?, ?, ?)",
+                           ((i, *row) for i, row in enumerate(_rows(self.path))))
+            db.execute("INSERT INTO meta VALUES ('source', ?)", (self._source,))
+            db.commit()
+        except BaseException:
+            db.close()
+            os.remove(tmp)
+            raise
+        db.close()
+        os.replace(tmp, self.index)
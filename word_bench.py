@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""word_bank 词库的基准测试：加载耗时和常驻内存（RSS）
+
+    python word_bench.py --words 20000
+    python word_bench.py --words 5000 --words 20000 --format csv
+
+每种方式在单独的子进程里测，互不影响内存：
+    全部读入    json.loads 每一行放进列表（相当于把词表写死在 word.py 里）
+    首次打开    WordBank 导入 SQLite 索引
+    再次打开    WordBank 直接使用已有索引
+"""
+import argparse, csv, json, os, random, subprocess, sys, tempfile, time
+
+POS = ["n.", "v.", "adj.", "adv.", "prep."]
+MEANINGS = ["许诺，保证", "小路；小径", "丧失；失去", "人", "花", "说", "学习", "快速地", "在……之上", "美丽的"]
+
+
+def gen_bank(path, words, seed=0):
+    rng = random.Random(seed)
+    items = []
+    for i in range(words):
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 12))) + str(i)
+        options = [f"{rng.choice(POS)}{rng.choice(MEANINGS)}" for _ in range(3)]
+        items.append((word, options, rng.randint(1, 3)))
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            writer = csv.writer(f)
+            writer.writerow(["单词", "选项1", "选项2", "选项3", "正确答案"])
+            writer.writerows([word, *options, answer] for word, options, answer in items)
+        else:
+            for word, options, answer in items:
+                f.write(json.dumps({"单词": word, "选项": options, "正确答案": answer}, ensure_ascii=False) + "\n")
+
+
+def rss_kb():
+    """当前常驻内存（KB）；没有 /proc 时退回到峰值"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def child(mode, path, fetches):
+    """子进程：加载词库，随机取 fetches 道题，输出一行 JSON"""
+    import word_bank
+    base = rss_kb()
+    start = time.perf_counter()
+    if mode == "list":
+        if path.endswith(".csv"):
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                bank = [{"单词": r["单词"], "选项": [r["选项1"], r["选项2"], r["选项3"]], "正确答案": int(r["正确答案"])}
+                        for r in csv.DictReader(f)]
+        else:
+            with open(path, encoding="utf-8") as f:
+                bank = [json.loads(line) for line in f]
+    else:
+        bank = word_bank.WordBank(path)
+    load_ms = (time.perf_counter() - start) * 1000
+    rng = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(fetches):
+        bank[rng.randrange(len(bank))]
+    fetch_us = (time.perf_counter() - start) / fetches * 1e6
+    print(json.dumps({"load_ms": load_ms, "rss_kb": rss_kb() - base, "fetch_us": fetch_us, "words": len(bank)}))
+
+
+def run_child(mode, path, fetches):
+    out = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", mode, path,
+                                   "--fetches", str(fetches)], text=True)
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, action="append", help="词库大小，可多次给出，默认 20000")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    parser.add_argument("--fetches", type=int, default=1000, help="随机取题次数")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child, args.fetches)
+        return
+
+    print(f"{'词数':>7}  {'方式':10}{'加载 ms':>10}{'RSS 增量 KB':>13}{'取一题 us':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for words in args.words or [20000]:
+            path = os.path.join(tmp, f"bank_{words}.{args.format}")
+            gen_bank(path, words)
+            for label, mode in (("全部读入", "list"), ("首次打开", "bank"), ("再次打开", "bank")):
+                r = run_child(mode, path, args.fetches)
+                print(f"{r['words']:7d}  {label:10}{r['load_ms']:10.1f}{r['rss_kb']:13d}{r['fetch_us']:11.1f}")
+            size = os.path.getsize(path) // 1024
+            print(f"{'':9}词库 {size} KB, 索引 {os.path.getsize(path + '.db') // 1024} KB")
+
+
+if __name__ == "__main__":
+    main()